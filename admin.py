@@ -1,11 +1,24 @@
-
-from flask import Blueprint, jsonify, request, abort
-from src.models.user import User, db
-from src.models.product import Product
-
-
 from functools import wraps
-from flask import request, abort
+
+import jwt
+from flask import Blueprint, Response, jsonify, request, abort, stream_with_context
+from src.models.user import db
+from src.models.product_schema import Product
+from src.models.sale import FlashSale
+from src.services.idempotency import idempotent
+from src.services.guest_cart import merge_guest_cart
+from src.services.tokens import issue_token, verify_token, user_is_admin
+from src.services.passwords import init_password_hasher, authenticate, PasswordHasherBusy
+from src.services.rate_limit import init_rate_limiter, rate_limit, by_login_email
+from src.services.user_listing import list_users
+from src.services.user_import import read_records, import_users
+from src.services.product_import import import_products
+from src.services.product_filters import product_filters
+from src.services.product_bulk import product_changes, bulk_update_products
+from src.services.product_archive import archive_products, unarchive_products
+from src.services.exports import EXPORTS, export_rows
+from src.services.dashboard_stats import read_stats
+from src.services.user_email import find_user_by_email
 
 def require_admin_token(func):
     @wraps(func)
@@ -15,7 +28,7 @@ def require_admin_token(func):
             abort(401, "Missing or invalid authorization header")
         token = auth_header.split(" ")[1]
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+            payload = verify_token(token)
             if not payload.get("is_admin"):
                 abort(403, "Admin access required")
         except jwt.ExpiredSignatureError:
@@ -27,19 +40,36 @@ def require_admin_token(func):
 
 admin_bp = Blueprint('admin', __name__)
 
+@admin_bp.record_once
+def _setup_services(state):
+    init_password_hasher(state.app)
+    init_rate_limiter(state.app)
+
 def is_admin(user_id):
-    user = User.query.get(user_id)
-    return user and getattr(user, "is_admin", False)
+    return user_is_admin(user_id)
 
 @admin_bp.route('/admin/users', methods=['GET'])
 def admin_get_users():
     admin_id = request.headers.get('X-Admin-ID')
     if not is_admin(admin_id):
         abort(403)
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    return list_users()
+
+@admin_bp.route('/admin/users/import', methods=['POST'])
+def admin_import_users():
+    """Bulk-create users from a CSV or NDJSON request body"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    fmt = request.args.get('format') or ('ndjson' if 'ndjson' in (request.mimetype or '') else 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    chunk_size = min(max(request.args.get('chunk_size', 1000, type=int), 1), 10000)
+    report = import_users(read_records(request.stream, fmt), chunk_size=chunk_size)
+    return jsonify(report)
 
 @admin_bp.route('/admin/products', methods=['POST'])
+@idempotent
 def admin_create_product():
     admin_id = request.headers.get('X-Admin-ID')
     if not is_admin(admin_id):
@@ -50,44 +80,187 @@ def admin_create_product():
     db.session.commit()
     return jsonify(product.to_dict()), 201
 
+@admin_bp.route('/admin/products/import', methods=['POST'])
+def admin_import_products():
+    """Create or update products, matched by name, from a CSV or NDJSON request body"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    fmt = request.args.get('format') or ('ndjson' if 'ndjson' in (request.mimetype or '') else 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    chunk_size = min(max(request.args.get('chunk_size', 1000, type=int), 1), 10000)
+    report = import_products(read_records(request.stream, fmt), chunk_size=chunk_size)
+    return jsonify(report)
+
+@admin_bp.route('/admin/products/bulk-update', methods=['POST'])
+@idempotent
+def admin_bulk_update_products():
+    """Update every product matching a /products-style filter with one UPDATE.
+
+    Body: {"filter": {...}, "set": {...}, "dry_run": false}. An empty filter
+    is refused unless "all" is true. Archived products are left alone unless
+    "include_archived" is true.
+    """
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    data = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(data.get('filter', {}), dict):
+            raise ValueError('filter must be an object')
+        clauses = product_filters(data.get('filter', {}), strict=True)
+        values = product_changes(data.get('set'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not clauses and data.get('all') is not True:
+        return jsonify({'error': 'An empty filter matches every product; send "all": true to confirm'}), 400
+    if data.get('include_archived') is not True:
+        clauses.append(Product.is_active == True)
+
+    if data.get('dry_run'):
+        return jsonify({'dry_run': True, 'matched': bulk_update_products(clauses, values, dry_run=True)})
+    updated = bulk_update_products(clauses, values)
+    db.session.commit()
+    return jsonify({'dry_run': False, 'updated': updated})
+
 @admin_bp.route('/admin/products/<int:product_id>', methods=['DELETE'])
 def admin_delete_product(product_id):
     admin_id = request.headers.get('X-Admin-ID')
     if not is_admin(admin_id):
         abort(403)
-    product = Product.query.get_or_404(product_id)
-    db.session.delete(product)
+    Product.query.get_or_404(product_id)
+    # Soft delete: cart lines and order items keep pointing at a real row,
+    # and the purge job removes it once it has been archived long enough
+    archive_products([Product.id == product_id])
     db.session.commit()
     return jsonify({'message': 'Product deleted'})
 
-@admin_bp.route('/admin/login', methods=['POST'])
-def admin_login():
-    data = request.json
-    email = data.get('email')
-    user = User.query.filter_by(email=email, is_admin=True).first()
-    if not user:
-        return jsonify({'error': 'Invalid admin credentials'}), 401
-    return jsonify(user.to_dict()), 200
+def _archive_selection(data):
+    """WHERE clauses from {"product_ids": [...]} or {"filter": {...}}; raises ValueError"""
+    if 'product_ids' in data:
+        ids = data['product_ids']
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError('product_ids must be a non-empty list of ids')
+        return [Product.id.in_(ids)]
+    if not isinstance(data.get('filter'), dict):
+        raise ValueError('Send product_ids or a filter')
+    clauses = product_filters(data['filter'], strict=True)
+    if not clauses and data.get('all') is not True:
+        raise ValueError('An empty filter matches every product; send "all": true to confirm')
+    return clauses
 
-import jwt
-import datetime
+@admin_bp.route('/admin/products/archive', methods=['POST'])
+def admin_archive_products():
+    """Archive (soft-delete) many products with one UPDATE"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    try:
+        clauses = _archive_selection(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    archived = archive_products(clauses)
+    db.session.commit()
+    return jsonify({'archived': archived})
 
-SECRET_KEY = os.getenv("SECRET_KEY", "mauma_secret_key")
+@admin_bp.route('/admin/products/unarchive', methods=['POST'])
+def admin_unarchive_products():
+    """Restore archived products with one UPDATE"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    try:
+        clauses = _archive_selection(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    restored = unarchive_products(clauses)
+    db.session.commit()
+    return jsonify({'restored': restored})
+
+@admin_bp.route('/admin/stats', methods=['GET'])
+def admin_stats():
+    """Dashboard numbers from the rollup tables (see `flask product refresh-stats`)"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    return jsonify(read_stats())
+
+@admin_bp.route('/admin/exports/<entity>', methods=['GET'])
+def admin_export(entity):
+    """Stream every product, user or cart row as CSV or NDJSON (?format=, ?gzip=1)"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    if entity not in EXPORTS:
+        abort(404)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    gzip = request.args.get('gzip') in ('1', 'true')
+    # Products take the /products filters
+    clauses = product_filters(request.args) if entity == 'products' else []
+
+    filename = f'{entity}.{fmt}' + ('.gz' if gzip else '')
+    mimetype = 'application/gzip' if gzip else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    return Response(
+        stream_with_context(export_rows(entity, fmt, clauses, gzip=gzip)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@admin_bp.route('/admin/flash-sales', methods=['GET'])
+def admin_list_flash_sales():
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    return jsonify([sale.to_dict() for sale in FlashSale.query.all()])
+
+@admin_bp.route('/admin/flash-sales/<int:product_id>', methods=['PUT'])
+def admin_start_flash_sale(product_id):
+    """Serve a product's stock from in-memory counters; workers pick it up within a reconcile interval"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    Product.query.get_or_404(product_id)
+    block_size = (request.get_json(silent=True) or {}).get('block_size', 50)
+    if not isinstance(block_size, int) or block_size < 1:
+        return jsonify({'error': 'block_size must be a positive integer'}), 400
+    sale = db.session.merge(FlashSale(product_id=product_id, block_size=block_size))
+    db.session.commit()
+    return jsonify(sale.to_dict())
+
+@admin_bp.route('/admin/flash-sales/<int:product_id>', methods=['DELETE'])
+def admin_end_flash_sale(product_id):
+    """End a flash sale; unsold units held by workers go back to products on their next reconcile"""
+    admin_id = request.headers.get('X-Admin-ID')
+    if not is_admin(admin_id):
+        abort(403)
+    sale = FlashSale.query.get_or_404(product_id)
+    db.session.delete(sale)
+    db.session.commit()
+    return jsonify({'message': 'Flash sale ended'})
 
 @admin_bp.route('/admin/login', methods=['POST'])
+@rate_limit('admin-login-ip', limit=10, per=60)
+@rate_limit('admin-login-account', limit=5, per=300, key=by_login_email)
 def admin_login():
     data = request.json
     email = data.get('email')
     password = data.get('password')
-    user = User.query.filter_by(email=email, is_admin=True).first()
+    user = find_user_by_email(email, is_admin=True)
 
-    if not user or not user.check_password(password):
+    try:
+        valid = authenticate(user, password)
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Too many sign-ins in progress, please retry'}), 503, {'Retry-After': '1'}
+    if not valid:
         return jsonify({'error': 'Invalid email or password'}), 401
 
-    token = jwt.encode({
-        'user_id': user.id,
-        'is_admin': True,
-        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
-    }, SECRET_KEY, algorithm='HS256')
+    token = issue_token(user.id, is_admin=True)
 
-    return jsonify({'token': token})
+    # Carry over anything the admin put in a guest cart before signing in
+    response = jsonify({'token': token})
+    merge_guest_cart(user.id, response)
+    db.session.commit()
+    return response
@@ -0,0 +1,8 @@
+from datetime import datetime
+from src.models.user import db
+
+class ProductArchive(db.Model):
+    """When a product was archived; only products listed here are ever purged"""
+    __tablename__ = 'product_archives'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,113 @@
+"""Checkout throughput benchmark.
+
+Builds a throwaway app on a temporary SQLite file, then has 1, 8 and 32
+concurrent clients repeatedly fill a cart and check out. Prints one JSON
+line per concurrency level with orders/sec.
+
+    python bench_checkout.py --duration 10 --clients 1 8 32
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask
+from sqlalchemy import insert
+from src.models.user import db, User
+from src.models.product import Category
+from src.models.product_schema import Product
+from src.routes.product import product_bp
+from src.services.tokens import issue_token
+
+def create_bench_app(database_uri):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'bench'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 60}}
+    app.config['STOCK_RESERVATIONS'] = True
+    app.config['RATE_LIMIT_ENABLED'] = False
+    db.init_app(app)
+    app.register_blueprint(product_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+    return app
+
+def seed(app, products, users):
+    with app.app_context():
+        category = Category(name='Bench', description='Benchmark category')
+        db.session.add(category)
+        db.session.flush()
+        db.session.execute(insert(Product), [{
+            'name': f'Bench product {i}',
+            'price': 1000 + i,
+            'price_kobo': (1000 + i) * 100,
+            'category_id': category.id,
+            'stock_quantity': 10 ** 9,
+            'is_active': True
+        } for i in range(products)])
+        db.session.execute(insert(User), [{
+            'username': f'bench{i}',
+            'email': f'bench{i}@mauma.ng'
+        } for i in range(users)])
+        db.session.commit()
+        return [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+
+def run_level(app, user_ids, clients, duration, products):
+    stop = threading.Event()
+    counts = [0] * clients
+    errors = [0] * clients
+
+    def client(index):
+        http = app.test_client()
+        headers = {'Authorization': f'Bearer {issue_token(user_ids[index])}'}
+        n = 0
+        while not stop.is_set():
+            product_id = 1 + (index * 7 + n) % products
+            http.post('/api/cart', json={'product_id': product_id, 'quantity': 2}, headers=headers)
+            http.post('/api/cart', json={'product_id': 1 + (product_id % products), 'quantity': 1}, headers=headers)
+            response = http.post('/api/checkout', headers=headers)
+            if response.status_code == 201:
+                counts[index] += 1
+            else:
+                errors[index] += 1
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'benchmark': 'checkout',
+        'clients': clients,
+        'seconds': round(elapsed, 3),
+        'orders': sum(counts),
+        'errors': sum(errors),
+        'orders_per_sec': round(sum(counts) / elapsed, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--products', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        user_ids = seed(app, args.products, max(args.clients))
+        for clients in args.clients:
+            print(json.dumps(run_level(app, user_ids, clients, args.duration, args.products)), flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,496 @@
+"""Endpoint benchmark suite.
+
+For each catalog size, generates a synthetic database (see
+catalog_generator), then times every route of the product, user and admin
+blueprints and of simple_main.py, through the Flask test client and over
+HTTP against a werkzeug server. Prints one JSON line per (size, transport,
+route) with throughput, p50/p95/p99 latency, SQL statements per request and
+peak RSS. --output writes every result, plus how each route's median latency
+grows with the catalog, as one JSON document; --baseline compares this run
+with such a document and exits 1 on regressions.
+
+    python bench_endpoints.py --sizes 10000 100000 1000000 --output bench.json
+    python bench_endpoints.py --sizes 10000 --baseline bench.json
+"""
+import argparse
+import http.client
+import importlib.util
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.engine import Engine
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import make_server
+from src.models.user import db, User
+from src.models.user_schema import user_email_normalized_index  # noqa: F401 (adds User.email_normalized)
+from src.models.product import Category, Cart
+from src.models.product_schema import Product
+from src.models.sale import FlashSale
+from src.routes.product import product_bp
+from src.routes.user import user_bp
+from src.routes.admin import admin_bp
+from src.services.catalog_generator import generate_catalog
+from src.services.dashboard_stats import refresh_stats
+from src.services.product_archive import archive_products
+from src.services.tokens import issue_token
+
+SIMPLE_MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simple_main.py')
+PASSWORD = 'bench-password'
+
+# SQL statements run while a timed request is in flight
+_statements = [0]
+_counting = threading.Event()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(*args):
+    if _counting.is_set():
+        _statements[0] += 1
+
+def create_bench_app(database_uri):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'bench'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 60}}
+    app.config['RATE_LIMIT_ENABLED'] = False
+    # Keep background threads from adding statements to the counts
+    app.config['REVOCATION_REFRESH'] = 3600
+    db.init_app(app)
+    for blueprint in (product_bp, user_bp, admin_bp):
+        app.register_blueprint(blueprint, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+    return app
+
+def load_simple_app(workdir):
+    """Import a copy of simple_main.py from ``workdir``, so it uses workdir/database/simple_app.db"""
+    path = os.path.join(workdir, 'simple_main.py')
+    shutil.copy(SIMPLE_MAIN, path)
+    spec = importlib.util.spec_from_file_location(f'bench_simple_main_{os.path.basename(workdir)}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+def seed(app, size):
+    """Generate the catalog and return the ids and tokens the scenarios draw from"""
+    with app.app_context():
+        users = max(1000, size // 10)
+        started = time.perf_counter()
+        counts = generate_catalog(
+            products=size, users=users, carts=users // 2,
+            password_hash=generate_password_hash(PASSWORD)
+        )
+        generate_seconds = time.perf_counter() - started
+
+        admin_id = db.session.execute(insert(User).values(
+            username='bench-admin', email='bench-admin@example.com', email_normalized='bench-admin@example.com',
+            password_hash=generate_password_hash(PASSWORD), is_admin=True
+        )).inserted_primary_key[0]
+        db.session.commit()
+        refresh_stats()
+
+        owners = db.session.scalars(select(Cart.user_id).distinct().order_by(Cart.user_id).limit(200)).all()
+        user_ids = db.session.scalars(select(User.id).where(User.is_admin == False).order_by(User.id)).all()
+        owned = set(db.session.scalars(select(Cart.user_id).distinct()))
+        items = db.session.execute(
+            select(Cart.id, Cart.user_id).where(Cart.user_id.in_(owners)).order_by(Cart.id)
+        ).all()
+        first_product, last_product = db.session.execute(select(func.min(Product.id), func.max(Product.id))).one()
+        return {
+            'size': size,
+            'rows': counts,
+            'generate_seconds': round(generate_seconds, 1),
+            'admin_headers': {
+                'X-Admin-ID': str(admin_id),
+                'Authorization': f'Bearer {issue_token(admin_id, is_admin=True)}'
+            },
+            'users': user_ids[:200],
+            'owners': [(user_id, {'Authorization': f'Bearer {issue_token(user_id)}'}) for user_id in owners],
+            'buyers': [
+                (user_id, {'Authorization': f'Bearer {issue_token(user_id)}'})
+                for user_id in user_ids if user_id not in owned
+            ][:200],
+            'items': [(item_id, {'Authorization': f'Bearer {issue_token(user_id)}'}) for item_id, user_id in items],
+            'products': (first_product, last_product),
+            'categories': db.session.scalars(select(Category.id).order_by(Category.id)).all(),
+            'brands': db.session.scalars(select(Product.brand).distinct().order_by(Product.brand)).all(),
+            'unique': itertools.count(),
+        }
+
+def _insert(model, **values):
+    primary_key = db.session.execute(insert(model).values(**values)).inserted_primary_key[0]
+    db.session.commit()
+    return primary_key
+
+def _new_product(ctx, stock_quantity=10):
+    n = next(ctx['unique'])
+    return _insert(
+        Product, name=f'Bench product {n}', price=1000.0, price_kobo=100000, stock_quantity=stock_quantity,
+        category_id=ctx['categories'][n % len(ctx['categories'])], is_active=True
+    )
+
+def _product_id(ctx, i):
+    first, last = ctx['products']
+    return first + (i * 7919) % (last - first + 1)
+
+def _pick(values, i):
+    return values[i % len(values)]
+
+def _archived_product(ctx):
+    product_id = _new_product(ctx)
+    archive_products([Product.id == product_id])
+    db.session.commit()
+    return product_id
+
+def _flash_sale_product(ctx):
+    product_id = _new_product(ctx)
+    _insert(FlashSale, product_id=product_id, block_size=10)
+    return product_id
+
+def _checkout_request(ctx, i):
+    user_id, headers = _pick(ctx['buyers'], i)
+    _insert(Cart, user_id=user_id, product_id=_new_product(ctx), quantity=1)
+    return {'path': '/api/checkout', 'headers': headers}
+
+def _ndjson(rows):
+    return {'data': '\n'.join(json.dumps(row) for row in rows), 'content_type': 'application/x-ndjson'}
+
+def _login(path, email):
+    return {'path': path, 'json': {'email': email, 'password': PASSWORD}}
+
+# (app, method, route, request builder, accepted statuses, most requests to time)
+# The builder runs untimed inside the bench app's context; it may write the
+# rows the request needs and returns the path and any body or headers.
+SCENARIOS = [
+    ('api', 'GET', '/api/products', lambda ctx, i: {'path': '/api/products'}, (200,), None),
+    ('api', 'GET', '/api/products?category_id', lambda ctx, i: {
+        'path': f"/api/products?category_id={_pick(ctx['categories'], i)}"
+    }, (200,), None),
+    ('api', 'GET', '/api/products?search', lambda ctx, i: {'path': '/api/products?search=Ultra'}, (200,), None),
+    ('api', 'GET', '/api/products?min_price&max_price', lambda ctx, i: {
+        'path': '/api/products?min_price=10000&max_price=20000&page=2'
+    }, (200,), None),
+    ('api', 'GET', '/api/products/<id>', lambda ctx, i: {'path': f'/api/products/{_product_id(ctx, i)}'}, (200,), None),
+    ('api', 'GET', '/api/categories', lambda ctx, i: {'path': '/api/categories'}, (200,), None),
+    ('api', 'GET', '/api/cart', lambda ctx, i: {'path': '/api/cart', 'headers': _pick(ctx['owners'], i)[1]}, (200,), None),
+    ('api', 'POST', '/api/cart', lambda ctx, i: {
+        'path': '/api/cart', 'headers': _pick(ctx['owners'], i)[1],
+        'json': {'product_id': _product_id(ctx, i), 'quantity': 1}
+    }, (200,), None),
+    ('api', 'PATCH', '/api/cart', lambda ctx, i: {
+        'path': '/api/cart', 'headers': _pick(ctx['owners'], i)[1],
+        'json': {'operations': [{'op': 'add', 'product_id': _product_id(ctx, i + 1), 'quantity': 1}]}
+    }, (200,), None),
+    ('api', 'PUT', '/api/cart/<id>', lambda ctx, i: {
+        'path': f"/api/cart/{_pick(ctx['items'], i)[0]}", 'headers': _pick(ctx['items'], i)[1], 'json': {'quantity': 2}
+    }, (200,), None),
+    ('api', 'DELETE', '/api/cart/<id>', lambda ctx, i: {
+        'path': f"/api/cart/{_insert(Cart, user_id=_pick(ctx['owners'], i)[0], product_id=_new_product(ctx))}",
+        'headers': _pick(ctx['owners'], i)[1]
+    }, (200,), None),
+    ('api', 'POST', '/api/checkout', _checkout_request, (201,), None),
+    ('api', 'GET', '/api/users', lambda ctx, i: {'path': '/api/users?limit=50'}, (200,), None),
+    ('api', 'GET', '/api/users?email_prefix', lambda ctx, i: {'path': f'/api/users?email_prefix=user{i % 10}'}, (200,), None),
+    ('api', 'POST', '/api/users', lambda ctx, i: {
+        'path': '/api/users', 'json': {'username': f"new{next(ctx['unique'])}", 'email': f"new{next(ctx['unique'])}@example.com"}
+    }, (201,), None),
+    ('api', 'GET', '/api/users/<id>', lambda ctx, i: {'path': f"/api/users/{_pick(ctx['users'], i)}"}, (200,), None),
+    ('api', 'PUT', '/api/users/<id>', lambda ctx, i: {
+        'path': f"/api/users/{_pick(ctx['users'], i)}", 'json': {'username': f"user{_pick(ctx['users'], i)}"}
+    }, (200,), None),
+    ('api', 'DELETE', '/api/users/<id>', lambda ctx, i: {'path': '/api/users/{}'.format(_insert(
+        User, username=f"gone{next(ctx['unique'])}", email=f"gone{next(ctx['unique'])}@example.com"
+    ))}, (204,), None),
+    ('api', 'POST', '/api/users/login', lambda ctx, i: _login(
+        '/api/users/login', f"user{_pick(ctx['users'], i)}@example.com"
+    ), (200,), 20),
+    ('api', 'POST', '/api/users/logout', lambda ctx, i: {
+        'path': '/api/users/logout', 'headers': {'Authorization': f"Bearer {issue_token(_pick(ctx['users'], i))}"}
+    }, (204,), None),
+    ('api', 'GET', '/api/admin/users', lambda ctx, i: {'path': '/api/admin/users?limit=50', 'headers': ctx['admin_headers']}, (200,), None),
+    ('api', 'POST', '/api/admin/users/import', lambda ctx, i: {
+        'path': '/api/admin/users/import', 'headers': ctx['admin_headers'],
+        **_ndjson({'username': f'imp{n}', 'email': f'imp{n}@example.com'} for n in itertools.islice(ctx['unique'], 10))
+    }, (200,), 50),
+    ('api', 'POST', '/api/admin/products', lambda ctx, i: {
+        'path': '/api/admin/products', 'headers': ctx['admin_headers'],
+        'json': {'name': f"Admin product {next(ctx['unique'])}", 'price': 2500, 'description': 'Created by the benchmark'}
+    }, (201,), None),
+    ('api', 'POST', '/api/admin/products/import', lambda ctx, i: {
+        'path': '/api/admin/products/import', 'headers': ctx['admin_headers'],
+        **_ndjson({'name': f'Imported product {n}', 'price': 1500} for n in itertools.islice(ctx['unique'], 10))
+    }, (200,), 50),
+    ('api', 'POST', '/api/admin/products/bulk-update', lambda ctx, i: {
+        'path': '/api/admin/products/bulk-update', 'headers': ctx['admin_headers'],
+        'json': {
+            'filter': {'category_id': _pick(ctx['categories'], i), 'brand': _pick(ctx['brands'], i)},
+            'set': {'brand': _pick(ctx['brands'], i)}
+        }
+    }, (200,), 50),
+    ('api', 'DELETE', '/api/admin/products/<id>', lambda ctx, i: {
+        'path': f'/api/admin/products/{_new_product(ctx)}', 'headers': ctx['admin_headers']
+    }, (200,), None),
+    ('api', 'POST', '/api/admin/products/archive', lambda ctx, i: {
+        'path': '/api/admin/products/archive', 'headers': ctx['admin_headers'], 'json': {'product_ids': [_new_product(ctx)]}
+    }, (200,), None),
+    ('api', 'POST', '/api/admin/products/unarchive', lambda ctx, i: {
+        'path': '/api/admin/products/unarchive', 'headers': ctx['admin_headers'],
+        'json': {'product_ids': [_archived_product(ctx)]}
+    }, (200,), None),
+    ('api', 'GET', '/api/admin/stats', lambda ctx, i: {'path': '/api/admin/stats', 'headers': ctx['admin_headers']}, (200,), None),
+    ('api', 'GET', '/api/admin/exports/products', lambda ctx, i: {
+        'path': f"/api/admin/exports/products?format=ndjson&category_id={_pick(ctx['categories'], i)}",
+        'headers': ctx['admin_headers']
+    }, (200,), 10),
+    ('api', 'GET', '/api/admin/flash-sales', lambda ctx, i: {'path': '/api/admin/flash-sales', 'headers': ctx['admin_headers']}, (200,), None),
+    ('api', 'PUT', '/api/admin/flash-sales/<id>', lambda ctx, i: {
+        'path': f'/api/admin/flash-sales/{_new_product(ctx)}', 'headers': ctx['admin_headers'], 'json': {'block_size': 10}
+    }, (200,), None),
+    ('api', 'DELETE', '/api/admin/flash-sales/<id>', lambda ctx, i: {
+        'path': f'/api/admin/flash-sales/{_flash_sale_product(ctx)}', 'headers': ctx['admin_headers']
+    }, (200,), None),
+    ('api', 'POST', '/api/admin/login', lambda ctx, i: _login('/api/admin/login', 'bench-admin@example.com'), (200,), 20),
+
+    # simple_main.py returns every matching product unpaginated, hence the low caps
+    ('simple', 'GET', '/api/health', lambda ctx, i: {'path': '/api/health'}, (200,), None),
+    ('simple', 'GET', '/api/categories', lambda ctx, i: {'path': '/api/categories'}, (200,), None),
+    ('simple', 'GET', '/api/products', lambda ctx, i: {'path': '/api/products'}, (200,), 3),
+    ('simple', 'GET', '/api/products?category_id', lambda ctx, i: {
+        'path': f"/api/products?category_id={_pick(ctx['categories'], i)}"
+    }, (200,), 10),
+    ('simple', 'GET', '/api/products/<id>', lambda ctx, i: {'path': f'/api/products/{_product_id(ctx, i)}'}, (200,), None),
+    ('simple', 'POST', '/api/seed-data', lambda ctx, i: {'path': '/api/seed-data'}, (200,), 20),
+    ('simple', 'GET', '/', lambda ctx, i: {'path': '/'}, (200, 404), None),
+]
+
+def _json_body(payload):
+    return json.dumps(payload)
+
+class TestClientTransport:
+    name = 'test-client'
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, json=None, data=None, headers=None, content_type=None):
+        response = self.client.open(path, method=method, json=json, data=data, headers=headers, content_type=content_type)
+        response.get_data()
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+class HTTPTransport:
+    """Requests over a keep-alive connection to a werkzeug server on a local port"""
+    name = 'http'
+
+    def __init__(self, app):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.port)
+
+    def send(self, method, path, json=None, data=None, headers=None, content_type=None):
+        headers = dict(headers or {})
+        body = data
+        if json is not None:
+            body, content_type = _json_body(json), 'application/json'
+        if content_type:
+            headers['Content-Type'] = content_type
+        self.connection.request(method, path, body=body.encode() if isinstance(body, str) else body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.thread.join()
+
+class PeakRSS:
+    """Highest resident set size seen while the block runs, sampled every 5 ms.
+
+    Reads /proc/self/statm; elsewhere it falls back to the process-lifetime
+    high-water mark from getrusage.
+    """
+
+    def __enter__(self):
+        self.peak = 0
+        self._stopped = threading.Event()
+        self._thread = None
+        if os.path.exists('/proc/self/statm'):
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        while True:
+            with open('/proc/self/statm') as statm:
+                self.peak = max(self.peak, int(statm.read().split()[1]) * page_size)
+            if self._stopped.wait(0.005):
+                return
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+def run_scenario(ctx, transport, scenario, requests, warmup):
+    _, method, route, build, accepted, cap = scenario
+    count = min(requests, cap or requests)
+    latencies, errors = [], 0
+    for i in range(warmup):
+        transport.send(method, **build(ctx, i))
+
+    _statements[0] = 0
+    with PeakRSS() as rss:
+        for i in range(warmup, warmup + count):
+            request = build(ctx, i)
+            _counting.set()
+            started = time.perf_counter()
+            status = transport.send(method, **request)
+            latencies.append(time.perf_counter() - started)
+            _counting.clear()
+            if status not in accepted:
+                errors += 1
+
+    ordered = sorted(latencies)
+    return {
+        'size': ctx['size'],
+        'transport': transport.name,
+        'route': f'{method} {route}' if scenario[0] == 'api' else f'simple_main {method} {route}',
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / sum(latencies), 1),
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(_percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 3),
+        'sql_per_request': round(_statements[0] / count, 2),
+        'peak_rss_mb': round(rss.peak / 2 ** 20, 1),
+    }
+
+def scaling(results):
+    """Least-squares slope of log(p50) over log(size) per route: ~0 is flat, ~1 grows linearly with the catalog"""
+    curves = {}
+    for result in results:
+        curves.setdefault((result['transport'], result['route']), []).append((result['size'], result['p50_ms']))
+    summary = []
+    for (transport, route), points in sorted(curves.items()):
+        entry = {'transport': transport, 'route': route, 'p50_ms': {str(size): p50 for size, p50 in points}}
+        if len(points) > 1:
+            xs = [math.log(size) for size, _ in points]
+            ys = [math.log(max(p50, 1e-3)) for _, p50 in points]
+            mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+            spread = sum((x - mean_x) ** 2 for x in xs)
+            if spread:
+                entry['exponent'] = round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread, 2)
+        summary.append(entry)
+    return summary
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Regressions of ``results`` against the results of a previous run"""
+    previous = {(r['size'], r['transport'], r['route']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['size'], result['transport'], result['route']))
+        if before is None:
+            continue
+        checks = [
+            ('p95_ms', result['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+                and result['p95_ms'] - before['p95_ms'] > min_delta_ms),
+            ('rps', result['rps'] < before['rps'] * (1 - tolerance)),
+            # Statement counts are deterministic, so any real increase counts
+            ('sql_per_request', result['sql_per_request'] > before['sql_per_request'] + 0.5),
+            ('errors', result['errors'] > before['errors']),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append({
+                    'regression': metric, 'size': result['size'], 'transport': result['transport'],
+                    'route': result['route'], 'baseline': before[metric], 'current': result[metric]
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='products per catalog')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route (some routes cap this)')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per route')
+    parser.add_argument('--transports', nargs='+', choices=['test-client', 'http'], default=['test-client', 'http'])
+    parser.add_argument('--routes', help='only routes containing this text')
+    parser.add_argument('--output', help='write all results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file from an earlier --output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative p95/throughput change')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore p95 changes smaller than this')
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.routes or args.routes in s[2]]
+    transports = {'test-client': TestClientTransport, 'http': HTTPTransport}
+    results, sizes = [], {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            os.makedirs(os.path.join(workdir, 'database'))
+            app = create_bench_app(f"sqlite:///{os.path.join(workdir, 'database', 'simple_app.db')}")
+            ctx = seed(app, size)
+            sizes[str(size)] = {'rows': ctx['rows'], 'generate_seconds': ctx['generate_seconds']}
+            apps = {'api': app, 'simple': load_simple_app(workdir)}
+            for name in args.transports:
+                clients = {key: transports[name](target) for key, target in apps.items()}
+                with app.app_context():
+                    for scenario in scenarios:
+                        result = run_scenario(ctx, clients[scenario[0]], scenario, args.requests, args.warmup)
+                        results.append(result)
+                        print(json.dumps(result), flush=True)
+                for client in clients.values():
+                    client.close()
+            with app.app_context():
+                db.engine.dispose()
+
+    document = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests': args.requests,
+        },
+        'sizes': sizes,
+        'results': results,
+        'scaling': scaling(results),
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(document, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(json.dumps(regression), flush=True)
+        print(json.dumps({'regressions': len(regressions)}), flush=True)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import atexit
+import logging
+import threading
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.services.cart_ops import set_quantities, remove_items
+
+logger = logging.getLogger(__name__)
+
+class CartWriteBuffer:
+    """Write-behind buffer for cart quantity changes.
+
+    PUT /cart/<id> records the new quantity here and returns at once; repeated
+    taps on the same item overwrite each other in memory and a background
+    thread writes whatever is left every ``window`` seconds in one transaction.
+    ``window`` is the durability knob: it bounds how long an acknowledged
+    update lives only in this process. ``max_pending`` forces an early flush
+    so the buffer stays small under load. A batch being written stays visible
+    to ``pending_for`` until its transaction commits.
+    """
+
+    def __init__(self, app, window=0.5, max_pending=1000):
+        self.app = app
+        self.window = window
+        self.max_pending = max_pending
+        self._pending = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def put(self, user_id, item_id, quantity):
+        """Record a quantity (0 removes the item) for later writing"""
+        with self._lock:
+            self._pending[(user_id, item_id)] = quantity
+            full = len(self._pending) >= self.max_pending
+            if self._thread is None:
+                self._start()
+        if full:
+            self._wake.set()
+
+    def pending_for(self, user_id):
+        """Return {item_id: quantity} not yet written for a user"""
+        with self._lock:
+            return {
+                item_id: quantity
+                for (owner, item_id), quantity in {**self._in_flight, **self._pending}.items()
+                if owner == user_id
+            }
+
+    def flush(self):
+        """Write every pending update in a transaction of its own.
+
+        Runs on the background thread and at exit. It opens its own app
+        context, so it never sees or joins a request's uncommitted rows;
+        requests use ``flush_user`` instead.
+        """
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return 0
+            with self.app.app_context():
+                try:
+                    self._write(batch)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    self._settle(batch, committed=False)
+                    raise
+            self._settle(batch, committed=True)
+            return len(batch)
+
+    def flush_user(self, user_id):
+        """Write one user's pending updates through the current request's session.
+
+        The rows commit or roll back with the caller's transaction. Until then
+        they stay visible to ``pending_for``, and a rollback returns them to
+        the buffer.
+        """
+        with self._flush_lock:
+            batch = self._take(user_id)
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception:
+                self._settle(batch, committed=False)
+                raise
+            db.session.info.setdefault('cart_buffer_batches', []).append((self, batch))
+            return len(batch)
+
+    def _take(self, user_id=None):
+        """Move pending updates, optionally only one user's, into the in-flight set"""
+        with self._lock:
+            if user_id is None:
+                batch, self._pending = self._pending, {}
+            else:
+                batch = {key: value for key, value in self._pending.items() if key[0] == user_id}
+                for key in batch:
+                    del self._pending[key]
+            self._in_flight.update(batch)
+        return batch
+
+    def _write(self, batch):
+        by_user = {}
+        for (owner, item_id), quantity in batch.items():
+            by_user.setdefault(owner, {})[item_id] = quantity
+        for owner, quantities in by_user.items():
+            remove_items(owner, [item_id for item_id, quantity in quantities.items() if quantity == 0])
+            set_quantities(owner, {item_id: quantity for item_id, quantity in quantities.items() if quantity})
+
+    def _settle(self, batch, committed):
+        """Drop a written batch from the in-flight set; on failure put it back unless a newer value arrived"""
+        with self._lock:
+            for key, value in batch.items():
+                if self._in_flight.get(key) == value:
+                    del self._in_flight[key]
+                if not committed:
+                    self._pending.setdefault(key, value)
+
+    def close(self):
+        """Stop the background thread and write everything still pending"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='cart-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.window)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Cart write-behind flush failed; retrying next window')
+
+# A batch written by flush_user belongs to the request's transaction: it
+# leaves the in-flight set on commit and goes back to the buffer when the
+# transaction ends any other way (rollback, or the session closing).
+
+@event.listens_for(Session, 'after_commit')
+def _settle_after_commit(session):
+    for buffer, batch in session.info.pop('cart_buffer_batches', []):
+        buffer._settle(batch, committed=True)
+
+@event.listens_for(Session, 'after_transaction_end')
+def _settle_after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        for buffer, batch in session.info.pop('cart_buffer_batches', []):
+            buffer._settle(batch, committed=False)
+
+def init_cart_buffer(app):
+    """Attach a buffer to the app when CART_WRITE_BEHIND is enabled"""
+    if app.config.get('CART_WRITE_BEHIND', False):
+        app.extensions['cart_write_buffer'] = CartWriteBuffer(
+            app,
+            window=app.config.get('CART_WRITE_BEHIND_WINDOW', 0.5),
+            max_pending=app.config.get('CART_WRITE_BEHIND_MAX_PENDING', 1000)
+        )
+
+def get_cart_buffer():
+    """Return the app's cart write buffer, or None when writes are synchronous"""
+    return current_app.extensions.get('cart_write_buffer')
@@ -0,0 +1,135 @@
+from sqlalchemy import case, delete, func, literal, select, update
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+from src.models.product import Cart
+from src.models.product_schema import Product
+
+# A user holds at most one row per product; quantities are merged by upsert
+cart_user_product_index = db.Index(
+    'uq_cart_user_product', Cart.user_id, Cart.product_id, unique=True
+)
+
+_dialect_inserts = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+def supports_upsert():
+    return db.session.get_bind().dialect.name in _dialect_inserts
+
+def upsert_insert():
+    """Return the ON CONFLICT-capable insert() for the bound dialect"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in _dialect_inserts:
+        raise NotImplementedError(f'Upserts are not supported on {dialect}; check supports_upsert() first')
+    return _dialect_inserts[dialect]
+
+def add_items(user_id, quantities):
+    """Upsert {product_id: quantity} into a user's cart in one statement"""
+    # INSERT ... SELECT over active products skips unknown ids; existing rows
+    # get the quantity added. Returns rows written; the caller commits.
+    quantities = {int(pid): int(qty) for pid, qty in quantities.items() if qty}
+    if not quantities:
+        return 0
+    if not supports_upsert():
+        return _add_items_without_upsert(user_id, quantities)
+
+    rows = select(
+        literal(user_id),
+        Product.id,
+        case(quantities, value=Product.id)
+    ).where(Product.id.in_(quantities), Product.is_active == True)
+
+    insert = upsert_insert()
+    stmt = insert(Cart).from_select(['user_id', 'product_id', 'quantity'], rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Cart.user_id, Cart.product_id],
+        set_={'quantity': Cart.quantity + stmt.excluded.quantity}
+    )
+    return db.session.execute(stmt).rowcount
+
+def _add_items_without_upsert(user_id, quantities):
+    """SELECT-then-INSERT/UPDATE for backends without ON CONFLICT.
+
+    The unique (user_id, product_id) index still turns a racing duplicate
+    insert into an IntegrityError instead of a second row.
+    """
+    active = db.session.scalars(
+        select(Product.id).where(Product.id.in_(quantities), Product.is_active == True)
+    ).all()
+    existing = dict(db.session.execute(
+        select(Cart.product_id, Cart.id).where(Cart.user_id == user_id, Cart.product_id.in_(active))
+    ).all())
+    for product_id in active:
+        if product_id in existing:
+            db.session.execute(
+                update(Cart).where(Cart.id == existing[product_id]).values(
+                    quantity=Cart.quantity + quantities[product_id]
+                ),
+                execution_options={'synchronize_session': False}
+            )
+        else:
+            db.session.execute(Cart.__table__.insert().values(
+                user_id=user_id, product_id=product_id, quantity=quantities[product_id]
+            ))
+    return len(active)
+
+def set_quantities(user_id, quantities):
+    """Set {item_id: quantity} on a user's cart rows with one UPDATE"""
+    if not quantities:
+        return 0
+    stmt = update(Cart).where(
+        Cart.id.in_(quantities), Cart.user_id == user_id
+    ).values(quantity=case(quantities, value=Cart.id))
+    return db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+
+def remove_items(user_id, item_ids):
+    """Delete the given cart rows of a user with one DELETE"""
+    if not item_ids:
+        return 0
+    stmt = delete(Cart).where(Cart.id.in_(item_ids), Cart.user_id == user_id)
+    return db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+
+def load_cart(user_id):
+    """Return (items, total_kobo, count) for a user's cart from one joined query"""
+    # Products are loaded alongside the cart rows and the total/count come
+    # back as window aggregates on every row. Lines for archived products
+    # are left out, as checkout leaves them out of the order.
+    rows = db.session.query(
+        Cart,
+        func.sum(Product.price_kobo * Cart.quantity).over().label('total'),
+        func.count(Cart.id).over().label('count')
+    ).join(Cart.product).options(
+        contains_eager(Cart.product)
+    ).filter(Cart.user_id == user_id, Product.is_active == True).order_by(Cart.id).all()
+
+    if not rows:
+        return [], 0, 0
+    return [row.Cart for row in rows], rows[0].total, rows[0].count
+
+def dedupe_cart_rows():
+    """Merge duplicate (user_id, product_id) rows left from before the unique index"""
+    dupes = db.session.execute(
+        select(Cart.user_id, Cart.product_id).group_by(
+            Cart.user_id, Cart.product_id
+        ).having(db.func.count(Cart.id) > 1)
+    ).all()
+
+    removed = 0
+    for user_id, product_id in dupes:
+        items = Cart.query.filter_by(user_id=user_id, product_id=product_id).order_by(Cart.id).all()
+        keep = items[0]
+        keep.quantity = sum(item.quantity for item in items)
+        for item in items[1:]:
+            db.session.delete(item)
+            removed += 1
+
+    db.session.commit()
+    return removed
+
+def ensure_cart_unique_index():
+    """Create the (user_id, product_id) unique index on existing databases"""
+    removed = dedupe_cart_rows()
+    cart_user_product_index.create(db.engine, checkfirst=True)
+    return removed
@@ -0,0 +1,182 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from src.models.user import db, User
+from src.models.user_schema import user_email_normalized_index  # noqa: F401 (adds User.email_normalized)
+from src.models.product import Category, Cart
+from src.models.product_schema import Product
+from src.services.money import KOBO_PER_NAIRA
+
+# Departments with a typical naira price range and the brands sold in them
+DEPARTMENTS = {
+    'Phones & Tablets': ((40000, 900000), ['Samsung', 'Apple', 'Xiaomi', 'Tecno', 'Infinix', 'Oppo']),
+    'Computing': ((60000, 2500000), ['HP', 'Dell', 'Lenovo', 'Apple', 'Asus', 'Acer']),
+    'Electronics': ((15000, 1500000), ['Sony', 'LG', 'Samsung', 'Hisense', 'TCL', 'JBL']),
+    'Fashion': ((3000, 120000), ['Nike', 'Adidas', 'Puma', "Levi's", 'Zara', 'H&M']),
+    'Home Appliances': ((10000, 800000), ['Dyson', 'Philips', 'Binatone', 'Midea', 'Scanfrost', 'Thermocool']),
+    'Health & Beauty': ((1500, 60000), ['Nivea', "L'Oreal", 'Dove', 'Garnier', 'Maybelline', 'Oral-B']),
+    'Groceries': ((500, 30000), ['Nestle', 'Indomie', 'Peak', 'Golden Penny', 'Dangote', 'Milo']),
+    'Building Materials': ((2000, 400000), ['Dangote', 'Lafarge', 'Bosch', 'Makita', 'Stanley', 'Berger']),
+    'Automotive': ((5000, 1200000), ['Michelin', 'Bosch', 'Castrol', 'Total', 'Dunlop', 'Mobil']),
+    'Baby Products': ((1000, 150000), ['Pampers', 'Huggies', 'Johnson', 'Cerelac', 'Chicco', 'Molfix']),
+}
+ADJECTIVES = ['Classic', 'Pro', 'Ultra', 'Smart', 'Compact', 'Premium', 'Essential', 'Max', 'Lite', 'Plus']
+NOUNS = ['Edition', 'Series', 'Model', 'Pack', 'Set', 'Kit', 'Bundle', 'Collection']
+
+# Inserted rows per executemany / transaction
+CHUNK_SIZE = 50000
+
+@contextmanager
+def sqlite_bulk_load(connection):
+    """Trade durability for speed on SQLite while ``connection`` loads data.
+
+    With synchronous=OFF and an in-memory rollback journal a crash mid-load
+    can corrupt the file, so only use this on a database that can be
+    regenerated. The previous settings are restored afterwards. Other
+    backends are left alone.
+    """
+    if connection.dialect.name != 'sqlite':
+        yield
+        return
+    previous = {
+        name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+        for name in ('synchronous', 'journal_mode', 'cache_size', 'temp_store')
+    }
+    connection.exec_driver_sql('PRAGMA synchronous = OFF')
+    connection.exec_driver_sql('PRAGMA journal_mode = MEMORY')
+    connection.exec_driver_sql('PRAGMA cache_size = -262144')  # 256 MiB
+    connection.exec_driver_sql('PRAGMA temp_store = MEMORY')
+    try:
+        yield
+    finally:
+        connection.rollback()
+        for name, value in previous.items():
+            connection.exec_driver_sql(f'PRAGMA {name} = {value}')
+
+def _next_id(connection, model):
+    return (connection.scalar(select(func.max(model.id))) or 0) + 1
+
+def _insert_chunks(connection, model, rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            connection.execute(insert(model), chunk)
+            connection.commit()
+            chunk = []
+    if chunk:
+        connection.execute(insert(model), chunk)
+        connection.commit()
+
+def generate_catalog(categories=50, products=100000, users=10000, carts=10000, seed=1,
+                     password_hash=None, chunk_size=CHUNK_SIZE, progress=None):
+    """Append a synthetic catalog, users and carts to the database.
+
+    Output depends only on ``seed`` and the counts: every value comes from a
+    seeded Random and ids are assigned here, continuing after the current
+    maximum, so an empty database always gets the same rows. Rows go in with
+    Core executemany INSERTs on one connection, ``chunk_size`` per
+    transaction, under sqlite_bulk_load. Categories are matched by name, so
+    ones that already exist (the seeded departments, or an earlier run) are
+    reused rather than duplicated. Prices follow a log-uniform spread
+    within each department's range; about one product in five is discounted
+    and one in fifty featured. Every user gets ``password_hash`` (None means
+    they cannot log in). ``carts`` users, picked at random, hold one to five
+    distinct products each. ``progress`` is called with (table, rows).
+    Returns the row counts inserted per table.
+    """
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1)
+    counts = {}
+
+    def report(table, count):
+        counts[table] = count
+        if progress:
+            progress(table, count)
+
+    with db.engine.connect() as connection, sqlite_bulk_load(connection):
+        departments = list(DEPARTMENTS)
+        wanted = []
+        for n in range(categories):
+            department = departments[n % len(departments)]
+            wanted.append((department if n < len(departments) else f'{department} {n // len(departments) + 1}', department))
+        existing = dict(connection.execute(
+            select(Category.name, Category.id).where(Category.name.in_([name for name, _ in wanted]))
+        ).all())
+
+        category_id = _next_id(connection, Category)
+        category_rows = []
+        catalog_categories = []
+        for name, department in wanted:
+            if name not in existing:
+                existing[name] = category_id
+                category_rows.append({
+                    'id': category_id, 'name': name, 'description': f'{name} for every budget',
+                    'icon': 'tag', 'created_at': now
+                })
+                category_id += 1
+            catalog_categories.append({'id': existing[name], 'name': name, 'department': department})
+        _insert_chunks(connection, Category, category_rows, chunk_size)
+        report('categories', len(category_rows))
+
+        product_id = _next_id(connection, Product)
+
+        def product_rows():
+            for n in range(products):
+                category = catalog_categories[rng.randrange(categories)]
+                (low, high), brands = DEPARTMENTS[category['department']]
+                price_kobo = int(low * (high / low) ** rng.random()) * KOBO_PER_NAIRA
+                original_kobo = price_kobo * rng.choice((110, 125, 140, 150)) // 100 if rng.random() < 0.2 else None
+                brand = rng.choice(brands)
+                yield {
+                    'id': product_id + n,
+                    'name': f'{brand} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id + n}',
+                    'description': f"{category['name']} item by {brand}",
+                    'price': price_kobo / KOBO_PER_NAIRA,
+                    'original_price': original_kobo / KOBO_PER_NAIRA if original_kobo else None,
+                    'price_kobo': price_kobo,
+                    'original_price_kobo': original_kobo,
+                    'category_id': category['id'],
+                    'brand': brand,
+                    'image_url': f'https://picsum.photos/seed/{product_id + n}/400/400',
+                    'stock_quantity': rng.choice((0, 5, 20, 50, 100, 500)),
+                    'rating': round(rng.uniform(2.5, 5.0), 1),
+                    'review_count': int(rng.expovariate(1 / 40)),
+                    'is_featured': rng.random() < 0.02,
+                    'is_active': True,
+                    'created_at': now - timedelta(minutes=rng.randrange(525600)),
+                }
+        _insert_chunks(connection, Product, product_rows(), chunk_size)
+        report('products', products)
+
+        user_id = _next_id(connection, User)
+
+        def user_rows():
+            for n in range(users):
+                email = f'user{user_id + n}@example.com'
+                yield {
+                    'id': user_id + n, 'username': f'user{user_id + n}', 'email': email,
+                    'email_normalized': email, 'password_hash': password_hash, 'is_admin': False,
+                    'created_at': now - timedelta(minutes=rng.randrange(525600)),
+                }
+        _insert_chunks(connection, User, user_rows(), chunk_size)
+        report('users', users)
+
+        cart_id = _next_id(connection, Cart)
+        lines = 0
+
+        def cart_rows():
+            nonlocal lines
+            if not products:
+                return
+            for owner in sorted(rng.sample(range(user_id, user_id + users), min(carts, users))):
+                for product in rng.sample(range(product_id, product_id + products), min(rng.randint(1, 5), products)):
+                    yield {
+                        'id': cart_id + lines, 'user_id': owner, 'product_id': product,
+                        'quantity': rng.randint(1, 3), 'created_at': now
+                    }
+                    lines += 1
+        _insert_chunks(connection, Cart, cart_rows(), chunk_size)
+        report('cart lines', lines)
+    return counts
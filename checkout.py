@@ -0,0 +1,109 @@
+from sqlalchemy import delete, func, insert, literal, select, update
+from src.models.user import db
+from src.models.product import Cart
+from src.models.product_schema import Product
+from src.models.order import Order, OrderItem
+from src.models.reservation import StockReservation
+from src.services.outbox import enqueue
+
+_no_sync = {'synchronize_session': False}
+
+class CheckoutError(Exception):
+    def __init__(self, message, status=409, product_ids=None):
+        super().__init__(message)
+        self.status = status
+        self.product_ids = product_ids or []
+
+def _stock_needed(user_id):
+    """Units each product still needs: cart quantity minus what the user has reserved"""
+    wanted = select(Cart.quantity).where(
+        Cart.user_id == user_id, Cart.product_id == Product.id
+    ).scalar_subquery()
+    reserved = select(StockReservation.quantity).where(
+        StockReservation.user_id == user_id, StockReservation.product_id == Product.id
+    ).scalar_subquery()
+    return wanted - func.coalesce(reserved, 0)
+
+def checkout_cart(user_id):
+    """Convert a user's cart into an order inside the current transaction.
+
+    Stock is taken with one conditional UPDATE over every product in the cart,
+    prices are snapshotted with one INSERT ... SELECT and the cart is cleared
+    with one DELETE. Lines for archived products are not shown in the cart,
+    so they stay out of the order and stay in the cart. The caller commits;
+    on CheckoutError the session has already been rolled back.
+    """
+    cart_products = select(Cart.product_id).where(Cart.user_id == user_id)
+    active_products = select(Product.id).where(Product.is_active == True)
+
+    line_count = db.session.scalar(
+        select(func.count(Cart.id)).join(Product, Product.id == Cart.product_id).where(
+            Cart.user_id == user_id, Product.is_active == True
+        )
+    )
+    if not line_count:
+        raise CheckoutError('Cart is empty', status=400)
+
+    # Reserved units are already off the shelf; a negative need hands back
+    # any reservation larger than the final quantity
+    needed = _stock_needed(user_id)
+    taken = db.session.execute(
+        update(Product).where(
+            Product.id.in_(cart_products),
+            Product.is_active == True,
+            Product.stock_quantity >= needed
+        ).values(stock_quantity=Product.stock_quantity - needed),
+        execution_options=_no_sync
+    ).rowcount
+
+    if taken != line_count:
+        db.session.rollback()
+        short = db.session.scalars(
+            select(Product.id).where(
+                Product.id.in_(cart_products),
+                Product.is_active == True,
+                Product.stock_quantity < _stock_needed(user_id)
+            ).order_by(Product.id)
+        ).all()
+        raise CheckoutError('Insufficient stock', product_ids=short)
+
+    db.session.execute(
+        delete(StockReservation).where(
+            StockReservation.user_id == user_id,
+            StockReservation.product_id.in_(cart_products),
+            StockReservation.product_id.in_(active_products)
+        ),
+        execution_options=_no_sync
+    )
+
+    order = Order(user_id=user_id, status='placed', item_count=line_count)
+    db.session.add(order)
+    db.session.flush()
+
+    db.session.execute(
+        insert(OrderItem).from_select(
+            ['order_id', 'product_id', 'product_name', 'unit_price_kobo', 'quantity'],
+            select(
+                literal(order.id), Product.id, Product.name, Product.price_kobo, Cart.quantity
+            ).join(Product, Product.id == Cart.product_id).where(Cart.user_id == user_id, Product.is_active == True)
+        )
+    )
+    order.total_kobo = db.session.scalar(
+        select(func.coalesce(func.sum(OrderItem.unit_price_kobo * OrderItem.quantity), 0)).where(
+            OrderItem.order_id == order.id
+        )
+    )
+
+    db.session.execute(
+        delete(Cart).where(Cart.user_id == user_id, Cart.product_id.in_(active_products)),
+        execution_options=_no_sync
+    )
+
+    # Emails, stock sync and analytics run from the outbox after commit
+    enqueue('order.placed', {
+        'order_id': order.id,
+        'user_id': user_id,
+        'total_kobo': order.total_kobo,
+        'item_count': line_count
+    })
+    return order
@@ -0,0 +1,69 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event, insert
+from src.models.user import db, User
+from src.models.product import Cart
+from src.models.product_schema import Product
+from src.routes.product import product_bp
+from src.routes.user import user_bp
+from src.routes.admin import admin_bp
+from src.services.tokens import issue_token
+
+@pytest.fixture
+def app(tmp_path):
+    """The three blueprints on a throwaway SQLite file"""
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test-secret-key-long-enough-for-hs256',
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 30}},
+        RATE_LIMIT_ENABLED=False,
+    )
+    db.init_app(app)
+    for blueprint in (product_bp, user_bp, admin_bp):
+        app.register_blueprint(blueprint, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def statements(app):
+    """SQL statements executed while the test runs; clear() it before the part being measured"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+def make_user(username='shopper'):
+    user = User(username=username, email=f'{username}@example.com')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+def make_products(count, stock_quantity=100, price_kobo=150000):
+    db.session.execute(insert(Product), [{
+        'name': f'Product {n}', 'price': price_kobo / 100, 'price_kobo': price_kobo,
+        'stock_quantity': stock_quantity, 'is_active': True
+    } for n in range(count)])
+    db.session.commit()
+    return [product.id for product in Product.query.order_by(Product.id)]
+
+def fill_cart(user_id, product_ids, quantity=1):
+    db.session.execute(insert(Cart), [
+        {'user_id': user_id, 'product_id': product_id, 'quantity': quantity} for product_id in product_ids
+    ])
+    db.session.commit()
+
+def auth(user_id):
+    return {'Authorization': f'Bearer {issue_token(user_id)}'}
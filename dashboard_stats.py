@@ -0,0 +1,71 @@
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, select
+from src.models.user import db
+from src.models.product import Cart
+from src.models.product_schema import Product
+from src.models.stats import CategoryStats, CartStats
+
+_no_sync = {'synchronize_session': False}
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def refresh_stats(now=None):
+    """Recompute both rollups with one SELECT ... GROUP BY each, then swap them in.
+
+    The scans happen here, off the request path; /admin/stats only reads the
+    few rollup rows, so its latency does not grow with the catalog. They run
+    as plain reads, and only the swap (a DELETE and a small INSERT per table)
+    takes the write lock, so writers are never held up for the length of a
+    full scan. ``flask product refresh-stats`` runs this on a schedule (cron,
+    a Heroku Scheduler job) from one place only; web workers never refresh,
+    so more workers do not mean more scans.
+    """
+    now = now or datetime.utcnow()
+    active = Product.is_active == True
+    category_rows = db.session.execute(
+        select(
+            func.coalesce(Product.category_id, 0).label('category_id'),
+            func.count().label('product_count'),
+            _count_if(active).label('active_count'),
+            _count_if(active & (Product.is_featured == True)).label('featured_count'),
+            func.coalesce(func.sum(case((active, Product.stock_quantity), else_=0)), 0).label('stock_units'),
+            func.coalesce(
+                func.sum(case((active, Product.price_kobo * Product.stock_quantity), else_=0)), 0
+            ).label('inventory_value_kobo')
+        ).group_by(func.coalesce(Product.category_id, 0))
+    ).mappings().all()
+    cart_row = db.session.execute(
+        select(
+            func.count(Cart.user_id.distinct()).label('carts'),
+            func.count(Cart.id).label('lines'),
+            func.coalesce(func.sum(Cart.quantity), 0).label('units'),
+            func.coalesce(func.sum(Cart.quantity * Product.price_kobo), 0).label('value_kobo')
+        ).select_from(Cart).outerjoin(Product, Product.id == Cart.product_id)
+    ).mappings().one()
+    # End the read before the write starts
+    db.session.rollback()
+
+    db.session.execute(delete(CategoryStats), execution_options=_no_sync)
+    if category_rows:
+        db.session.execute(insert(CategoryStats), [{**row, 'refreshed_at': now} for row in category_rows])
+    db.session.execute(delete(CartStats), execution_options=_no_sync)
+    db.session.execute(insert(CartStats), [{**cart_row, 'id': 1, 'refreshed_at': now}])
+    db.session.commit()
+
+def read_stats():
+    """The dashboard payload, read from the rollup tables only"""
+    categories = CategoryStats.query.order_by(CategoryStats.category_id).all()
+    carts = db.session.get(CartStats, 1)
+    return {
+        'refreshed_at': carts.refreshed_at.isoformat() if carts else None,
+        'products': {
+            'total': sum(row.product_count for row in categories),
+            'active': sum(row.active_count for row in categories),
+            'featured': sum(row.featured_count for row in categories),
+            'stock_units': sum(row.stock_units for row in categories),
+            'inventory_value_kobo': sum(row.inventory_value_kobo for row in categories)
+        },
+        'categories': [row.to_dict() for row in categories],
+        'carts': carts.to_dict() if carts else None
+    }
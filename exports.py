@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from sqlalchemy import select
+from src.models.user import db, User
+from src.models.product import Cart
+from src.models.product_schema import Product
+
+# Rows read per page (one short transaction each), and rows per chunk sent to the client
+FETCH_SIZE = 1000
+
+EXPORTS = {
+    'products': lambda: (Product, [
+        Product.id, Product.name, Product.brand, Product.category_id, Product.price_kobo,
+        Product.original_price_kobo, Product.stock_quantity, Product.is_featured,
+        Product.is_active, Product.created_at
+    ]),
+    # Never the password hash
+    'users': lambda: (User, [User.id, User.username, User.email, User.is_admin, User.created_at]),
+    'carts': lambda: (Cart, [Cart.id, Cart.user_id, Cart.product_id, Cart.quantity, Cart.created_at]),
+}
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_chunks(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(_json_value, row)))))
+        if len(lines) >= FETCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_rows(entity, fmt, clauses=(), gzip=False):
+    """Generate an export of ``entity`` as CSV or NDJSON, optionally gzipped.
+
+    Rows are read in keyset pages (``id > last id``, FETCH_SIZE at a time),
+    each on a pooled connection that is handed back before the page is sent.
+    No transaction stays open while the client downloads, so a slow download
+    never holds SQLite's read lock against writers, and memory stays
+    constant. The export is not one snapshot: a row changed mid-download
+    shows whichever version its page read. Run the generator inside
+    stream_with_context.
+    """
+    model, columns = EXPORTS[entity]()
+    names = [column.key for column in columns]
+    stmt = select(*columns).where(*clauses).order_by(model.id).limit(FETCH_SIZE)
+    id_index = names.index('id')
+
+    def rows():
+        last_id = None
+        while True:
+            with db.engine.connect() as connection:
+                page = connection.execute(stmt if last_id is None else stmt.where(model.id > last_id)).all()
+            for row in page:
+                yield tuple(row)
+            if len(page) < FETCH_SIZE:
+                return
+            last_id = page[-1][id_index]
+
+    chunks = _csv_chunks(names, rows()) if fmt == 'csv' else _ndjson_chunks(names, rows())
+    if gzip:
+        return _gzipped(chunks)
+    return (chunk.encode() for chunk in chunks)
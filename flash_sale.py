@@ -0,0 +1,426 @@
+import atexit
+import glob
+import logging
+import os
+import threading
+import uuid
+from flask import current_app
+from sqlalchemy import case, delete, event, select, update
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.models.product_schema import Product
+from src.models.sale import FlashSale, FlashSaleHold
+from src.services.cart_ops import upsert_insert
+
+try:
+    import fcntl
+except ImportError:  # not a POSIX host; journals cannot be locked, so flash sales stay off
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_no_sync = {'synchronize_session': False}
+
+class _Shard:
+    __slots__ = ('lock', 'available', 'journal_path', 'journal', 'sold')
+
+    def __init__(self, journal_path):
+        self.lock = threading.Lock()
+        self.available = {}
+        self.journal_path = journal_path
+        self.journal = None
+        # Net units sold per product since this shard's journal began
+        self.sold = {}
+
+class FlashSaleInventory:
+    """Sharded in-memory stock counters for flash-sale products.
+
+    Each worker pulls stock out of ``products`` in blocks with a conditional
+    UPDATE and records how much it holds in ``flash_sale_holds`` in the same
+    transaction. Shoppers then decrement the local counter under a per-shard
+    lock, so the hot product row is written once per block rather than once
+    per request. A refill runs in the requesting session's own transaction
+    with the shard lock released, and its units reach the shared counter only
+    once that transaction commits.
+
+    Every decrement and give-back is appended to its shard's write-ahead
+    journal under the shard lock before it is acknowledged, so shards never
+    wait on each other's writes. The counter always equals the hold minus the
+    journals' net sales. After a crash, ``recover`` subtracts the journaled
+    sales from the dead worker's holds and returns the rest to ``products``.
+    A background thread picks up sales started or ended in ``flash_sales``,
+    hands surplus units back in one batched UPDATE that shrinks the holds to
+    match, and compacts any shard journal that outgrows ``compact_bytes``.
+    """
+
+    def __init__(self, app, journal_dir, shards=16, interval=1.0, fsync=False, compact_bytes=1 << 20):
+        self.app = app
+        self.journal_dir = journal_dir
+        self.journal_id = uuid.uuid4().hex
+        self.interval = interval
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        # One journal per shard, named <journal_id>.<shard>.log
+        self._shards = [
+            _Shard(os.path.join(journal_dir, f'{self.journal_id}.{index}.log')) for index in range(shards)
+        ]
+        self._products = {}
+        self._start_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def is_active(self, product_id):
+        return product_id in self._products
+
+    def _shard(self, product_id):
+        return self._shards[product_id % len(self._shards)]
+
+    def _log(self, shard, op, product_id, quantity):
+        """Append to the shard's journal; the caller holds ``shard.lock``"""
+        shard.journal.write(f'{op} {product_id} {quantity}\n')
+        shard.journal.flush()
+        if self.fsync:
+            os.fsync(shard.journal.fileno())
+        sold = quantity if op == 'S' else -quantity
+        shard.sold[product_id] = shard.sold.get(product_id, 0) + sold
+
+    def take(self, product_id, quantity, session):
+        """Decrement the in-memory stock; returns False when the sale is sold out.
+
+        When the counter runs short the units left are borrowed and the rest
+        is pulled from products in ``session``'s transaction, so the refill
+        never waits on a write lock the request itself holds. The borrowed
+        units and any surplus of the block join the counter when ``session``
+        commits; a rollback returns only the borrowed ones.
+        """
+        shard = self._shard(product_id)
+        with shard.lock:
+            available = shard.available.get(product_id, 0)
+            if available >= quantity:
+                self._log(shard, 'S', product_id, quantity)
+                shard.available[product_id] = available - quantity
+                session.info.setdefault('flash_sale_taken', []).append((self, product_id, quantity))
+                return True
+            shard.available[product_id] = 0
+
+        block_size = self._products.get(product_id, 0)
+        try:
+            allocated = self._allocate(session, product_id, max(quantity - available, block_size))
+        except Exception:
+            self.restock(product_id, available)
+            raise
+
+        sold = quantity if available + allocated >= quantity else 0
+        if sold:
+            with shard.lock:
+                self._log(shard, 'S', product_id, sold)
+        session.info.setdefault('flash_sale_refills', []).append((self, product_id, available, allocated, sold))
+        return bool(sold)
+
+    def give_back(self, product_id, quantity):
+        """Return units to the in-memory stock (cart removals, failed requests)"""
+        shard = self._shard(product_id)
+        with shard.lock:
+            self._log(shard, 'G', product_id, quantity)
+            shard.available[product_id] = shard.available.get(product_id, 0) + quantity
+
+    def restock(self, product_id, quantity):
+        """Put units that never left the hold back on the counter; nothing is journaled"""
+        shard = self._shard(product_id)
+        with shard.lock:
+            shard.available[product_id] = shard.available.get(product_id, 0) + quantity
+
+    def settle_refill(self, product_id, borrowed, allocated, sold, committed):
+        """Finish a refill once its transaction ends.
+
+        On commit the block joins the hold, so the counter gets the borrowed
+        units plus the block, less the sale. On rollback the block never
+        existed: the sale is given back and the counter gets only the
+        borrowed units.
+        """
+        shard = self._shard(product_id)
+        with shard.lock:
+            if committed:
+                returned = borrowed + allocated - sold
+            else:
+                if sold:
+                    self._log(shard, 'G', product_id, sold)
+                returned = borrowed
+            shard.available[product_id] = shard.available.get(product_id, 0) + returned
+
+    def _allocate(self, session, product_id, want):
+        """Move up to ``want`` units from products into this worker's hold within ``session``'s transaction"""
+        for _ in range(3):
+            stock = session.scalar(
+                select(Product.stock_quantity).where(Product.id == product_id, Product.is_active == True)
+            )
+            if not stock or stock <= 0:
+                return 0
+            amount = min(want, stock)
+            taken = session.execute(
+                update(Product).where(
+                    Product.id == product_id, Product.stock_quantity >= amount
+                ).values(stock_quantity=Product.stock_quantity - amount),
+                execution_options=_no_sync
+            ).rowcount
+            if not taken:
+                continue
+
+            insert = upsert_insert()
+            stmt = insert(FlashSaleHold).values(journal_id=self.journal_id, product_id=product_id, held=amount)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=[FlashSaleHold.journal_id, FlashSaleHold.product_id],
+                set_={'held': FlashSaleHold.held + stmt.excluded.held}
+            ))
+            return amount
+        return 0
+
+    def _release_to_database(self, quantities):
+        """Hand {product_id: quantity} back to products and shrink the holds in one transaction"""
+        if not quantities:
+            return
+        with self.app.app_context():
+            db.session.execute(
+                update(Product).where(Product.id.in_(quantities)).values(
+                    stock_quantity=Product.stock_quantity + case(quantities, value=Product.id)
+                ),
+                execution_options=_no_sync
+            )
+            db.session.execute(
+                update(FlashSaleHold).where(
+                    FlashSaleHold.journal_id == self.journal_id, FlashSaleHold.product_id.in_(quantities)
+                ).values(held=FlashSaleHold.held - case(quantities, value=FlashSaleHold.product_id)),
+                execution_options=_no_sync
+            )
+            db.session.commit()
+
+    def reconcile(self):
+        """Sync the active sale list and return stock this worker no longer needs"""
+        with self.app.app_context():
+            sales = {sale.product_id: sale.block_size for sale in FlashSale.query.all()}
+            db.session.rollback()
+        self._products = sales
+
+        surplus = {}
+        for shard in self._shards:
+            with shard.lock:
+                for product_id, available in list(shard.available.items()):
+                    # Ended sales give everything back; running ones keep two blocks
+                    keep = 2 * sales[product_id] if product_id in sales else 0
+                    if available > keep:
+                        surplus[product_id] = available - keep
+                        shard.available[product_id] = keep
+        # The holds shrink in the same transaction that returns the units, so
+        # surplus returns are not journaled and recovery never counts them
+        try:
+            self._release_to_database(surplus)
+        except Exception:
+            for product_id, quantity in surplus.items():
+                self.restock(product_id, quantity)
+            raise
+
+        for shard in self._shards:
+            if shard.journal.tell() > self.compact_bytes:
+                self.compact(shard)
+
+    def compact(self, shard):
+        """Rewrite a shard's journal as one net line per product.
+
+        The new file is locked before it replaces the old one, so other
+        workers never see this journal unlocked.
+        """
+        with shard.lock:
+            temp_path = f'{shard.journal_path}.tmp'
+            journal = open(temp_path, 'w')
+            try:
+                fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                for product_id, sold in shard.sold.items():
+                    if sold:
+                        journal.write(f'S {product_id} {sold}\n' if sold > 0 else f'G {product_id} {-sold}\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+                os.replace(temp_path, shard.journal_path)
+            except Exception:
+                journal.close()
+                raise
+            shard.journal.close()
+            shard.journal = journal
+
+    def recover(self):
+        """Return the stock held by workers that died, using their journals"""
+        for path in glob.glob(os.path.join(self.journal_dir, '*.log.tmp')):
+            # Left behind by a compaction that died before its rename
+            try:
+                with open(path) as journal:
+                    fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.remove(path)
+            except (BlockingIOError, FileNotFoundError):
+                pass
+
+        others = {}
+        for path in glob.glob(os.path.join(self.journal_dir, '*.log')):
+            journal_id = os.path.basename(path).split('.')[0]
+            if journal_id != self.journal_id:
+                others.setdefault(journal_id, []).append(path)
+        for journal_id, paths in others.items():
+            self._recover_worker(journal_id, paths)
+
+    def _recover_worker(self, journal_id, paths):
+        """Return one dead worker's holds, less the sales in all of its shard journals"""
+        journals = []
+        try:
+            for path in paths:
+                try:
+                    journal = open(path)
+                except FileNotFoundError:
+                    return  # its worker is closing cleanly, or another recovery got here first
+                journals.append(journal)
+                try:
+                    fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # its worker is still alive
+                try:
+                    if os.stat(path).st_ino != os.fstat(journal.fileno()).st_ino:
+                        return  # compacted into a new file meanwhile
+                except FileNotFoundError:
+                    return  # removed by its worker or another recovery
+
+            spent = {}
+            for journal in journals:
+                for line in journal:
+                    parts = line.split()
+                    if len(parts) != 3:
+                        continue  # torn final write
+                    op, product_id, quantity = parts[0], int(parts[1]), int(parts[2])
+                    # Sales leave the hold; give-backs rejoin it
+                    spent[product_id] = spent.get(product_id, 0) + (-quantity if op == 'G' else quantity)
+
+            with self.app.app_context():
+                holds = db.session.execute(
+                    select(FlashSaleHold.product_id, FlashSaleHold.held).where(FlashSaleHold.journal_id == journal_id)
+                ).all()
+                leftover = {
+                    product_id: held - spent.get(product_id, 0)
+                    for product_id, held in holds if held - spent.get(product_id, 0) > 0
+                }
+                if leftover:
+                    db.session.execute(
+                        update(Product).where(Product.id.in_(leftover)).values(
+                            stock_quantity=Product.stock_quantity + case(leftover, value=Product.id)
+                        ),
+                        execution_options=_no_sync
+                    )
+                db.session.execute(
+                    delete(FlashSaleHold).where(FlashSaleHold.journal_id == journal_id),
+                    execution_options=_no_sync
+                )
+                db.session.commit()
+            logger.info('Recovered flash-sale journal %s: returned %s', journal_id, leftover)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        finally:
+            for journal in journals:
+                journal.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.journal_dir, exist_ok=True)
+            for shard in self._shards:
+                shard.journal = open(shard.journal_path, 'a')
+                fcntl.flock(shard.journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self.recover()
+            self.reconcile()
+            self._thread = threading.Thread(target=self._run, name='flash-sale-reconciler', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.reconcile()
+            except Exception:
+                logger.exception('Flash-sale reconciliation failed')
+
+    def close(self):
+        """Stop reconciling and return every unsold unit to products"""
+        if self._thread is None or self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._products = {}
+        self.reconcile()
+        for shard in self._shards:
+            shard.journal.close()
+            try:
+                os.remove(shard.journal_path)
+            except FileNotFoundError:
+                pass
+
+# Units taken or released inside a request only count once the transaction
+# commits; a rollback hands taken units back to the counters. A refill's
+# block joins the counter on commit and vanishes with the rollback.
+
+@event.listens_for(Session, 'after_commit')
+def _settle_after_commit(session):
+    session.info.pop('flash_sale_taken', None)
+    for inventory, *refill in session.info.pop('flash_sale_refills', []):
+        inventory.settle_refill(*refill, committed=True)
+    for inventory, product_id, quantity in session.info.pop('flash_sale_released', []):
+        inventory.give_back(product_id, quantity)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _settle_after_rollback(session, previous_transaction):
+    session.info.pop('flash_sale_released', None)
+    for inventory, product_id, quantity in session.info.pop('flash_sale_taken', []):
+        inventory.give_back(product_id, quantity)
+    for inventory, *refill in session.info.pop('flash_sale_refills', []):
+        inventory.settle_refill(*refill, committed=False)
+
+def take_flash_sale_stock(product_id, quantity):
+    """Take stock from the flash-sale counters; None when the product is not on sale"""
+    inventory = get_flash_sale_inventory()
+    if inventory is None or not inventory.is_active(product_id):
+        return None
+    return inventory.take(product_id, quantity, db.session)
+
+def release_flash_sale_stock(product_id, quantity):
+    """Queue units to go back to the counters on commit; False when not on sale"""
+    inventory = get_flash_sale_inventory()
+    if inventory is None or not inventory.is_active(product_id):
+        return False
+    db.session.info.setdefault('flash_sale_released', []).append((inventory, product_id, quantity))
+    return True
+
+def init_flash_sales(app):
+    """Attach the inventory when FLASH_SALES is enabled and the host can lock files.
+
+    Sale stock is handed out by reserve_stock, so a running inventory turns
+    stock reservations on as well (see stock.reservations_enabled).
+    """
+    if app.config.get('FLASH_SALES', False):
+        if fcntl is None:
+            logger.warning('FLASH_SALES is set but fcntl is unavailable on this host; flash sales are disabled')
+            return
+        app.extensions['flash_sale_inventory'] = FlashSaleInventory(
+            app,
+            journal_dir=app.config.get('FLASH_SALE_JOURNAL_DIR', os.path.join(app.instance_path, 'flash_sale_journal')),
+            shards=app.config.get('FLASH_SALE_SHARDS', 16),
+            interval=app.config.get('FLASH_SALE_RECONCILE_INTERVAL', 1.0),
+            fsync=app.config.get('FLASH_SALE_FSYNC', False),
+            compact_bytes=app.config.get('FLASH_SALE_JOURNAL_COMPACT_BYTES', 1 << 20)
+        )
+
+def start_flash_sales():
+    inventory = current_app.extensions.get('flash_sale_inventory')
+    if inventory is not None:
+        inventory.start()
+
+def get_flash_sale_inventory():
+    return current_app.extensions.get('flash_sale_inventory')
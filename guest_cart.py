@@ -0,0 +1,146 @@
+from flask import current_app, request
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from src.models.product_schema import Product
+from src.services.cart_ops import add_items
+from src.services.money import Money, money_fields
+from src.services.stock import reservations_enabled, reserve_stock
+
+# Browsers drop cookies over 4096 bytes; leave room for the attributes
+MAX_COOKIE_BYTES = 3800
+
+class GuestCartFull(Exception):
+    pass
+
+class GuestCartSessionInterface(SecureCookieSessionInterface):
+    """Session cookie signing with a salt of its own, so a session cookie can
+    never be replayed as a cart and vice versa"""
+    salt = 'guest-cart'
+
+_session_interface = GuestCartSessionInterface()
+
+class GuestCart:
+    """A guest's cart held client-side as signed [product_id, quantity] pairs.
+
+    Guests address their items by product id, so ``item_id`` in the cart
+    endpoints is the product id for them.
+    """
+
+    def __init__(self, quantities=None):
+        self.quantities = dict(quantities or {})
+        self.modified = False
+
+    @staticmethod
+    def cookie_name():
+        return current_app.config.get('GUEST_CART_COOKIE_NAME', 'mauma_cart')
+
+    @staticmethod
+    def _serializer():
+        return _session_interface.get_signing_serializer(current_app)
+
+    @classmethod
+    def load(cls):
+        """Read the guest cart from the request cookie; bad or stale cookies start empty"""
+        raw = request.cookies.get(cls.cookie_name())
+        serializer = cls._serializer()
+        if not raw or serializer is None:
+            return cls()
+        try:
+            pairs = serializer.loads(raw, max_age=int(current_app.permanent_session_lifetime.total_seconds()))
+            return cls({int(pid): int(qty) for pid, qty in pairs if int(qty) > 0})
+        except (BadSignature, TypeError, ValueError):
+            return cls()
+
+    def add(self, product_id, quantity):
+        max_items = current_app.config.get('GUEST_CART_MAX_ITEMS', 50)
+        if product_id not in self.quantities and len(self.quantities) >= max_items:
+            raise GuestCartFull(f'Guest carts hold at most {max_items} products')
+        self.quantities[product_id] = self.quantities.get(product_id, 0) + quantity
+        self.modified = True
+
+    def set(self, product_id, quantity):
+        if product_id not in self.quantities:
+            return False
+        if quantity == 0:
+            del self.quantities[product_id]
+        else:
+            self.quantities[product_id] = quantity
+        self.modified = True
+        return True
+
+    def remove(self, product_id):
+        return self.set(product_id, 0)
+
+    def clear(self):
+        self.quantities = {}
+        self.modified = True
+
+    def state(self):
+        """Serialize the cart the way GET /cart does, with one product query"""
+        if not self.quantities:
+            return {'cart_items': [], 'total': 0, 'total_kobo': 0, 'count': 0}
+
+        products = Product.query.filter(
+            Product.id.in_(list(self.quantities)), Product.is_active == True
+        ).order_by(Product.id).all()
+
+        cart_items = [{
+            'id': product.id,
+            'user_id': None,
+            'product_id': product.id,
+            'quantity': self.quantities[product.id],
+            'product': {**product.to_dict(), **money_fields(product)}
+        } for product in products]
+
+        total = sum((Money(product.price_kobo) * self.quantities[product.id] for product in products), Money(0))
+        return {
+            'cart_items': cart_items,
+            'total': total.naira,
+            'total_kobo': total.kobo,
+            'count': len(cart_items)
+        }
+
+    def save(self, response):
+        """Write the cart back to the response cookie if it changed"""
+        if not self.modified:
+            return response
+
+        name = self.cookie_name()
+        if not self.quantities:
+            response.delete_cookie(name)
+            return response
+
+        value = self._serializer().dumps([[pid, qty] for pid, qty in sorted(self.quantities.items())])
+        if len(value) > MAX_COOKIE_BYTES:
+            raise GuestCartFull('Guest cart is too large')
+
+        response.set_cookie(
+            name,
+            value,
+            max_age=current_app.permanent_session_lifetime,
+            httponly=True,
+            secure=current_app.config.get('SESSION_COOKIE_SECURE', False),
+            samesite=current_app.config.get('SESSION_COOKIE_SAMESITE') or 'Lax'
+        )
+        return response
+
+def merge_guest_cart(user_id, response):
+    """Fold the request's guest cart into a user's cart with one batched upsert.
+
+    With stock reservations on, each product is reserved first, as POST /cart
+    does, and products that are short are left out. The caller commits; the
+    cookie is cleared on ``response``.
+    """
+    cart = GuestCart.load()
+    if not cart.quantities:
+        return 0
+    quantities = cart.quantities
+    if reservations_enabled():
+        quantities = {
+            product_id: quantity for product_id, quantity in quantities.items()
+            if reserve_stock(user_id, product_id, quantity)
+        }
+    merged = add_items(user_id, quantities)
+    cart.clear()
+    cart.save(response)
+    return merged
@@ -0,0 +1,183 @@
+import hashlib
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.idempotency_key import IdempotencyKey
+from src.services.guest_cart import GuestCart
+
+_no_sync = {'synchronize_session': False}
+
+# Recomputed for every response, so never stored with it
+_UNSTORED_HEADERS = {'content-type', 'content-length', 'date', 'server'}
+
+# Requests running in this process, so local duplicates wait on an event
+# instead of polling the table
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _request_hash():
+    """Digest of everything that makes two requests 'the same request'"""
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.headers.get('Authorization', ''),
+                 request.headers.get('X-Admin-ID', ''), request.cookies.get(GuestCart.cookie_name(), '')):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    digest.update(request.get_data(cache=True))
+    return digest.digest()
+
+def _stored_headers(response):
+    return [[name, value] for name, value in response.headers.items() if name.lower() not in _UNSTORED_HEADERS]
+
+def _replay(record):
+    response = make_response(zlib.decompress(record.response_body), record.response_status)
+    response.content_type = record.response_type
+    for name, value in record.response_headers or ():
+        response.headers.add(name, value)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _in_progress():
+    return jsonify({'success': False, 'error': 'A request with this Idempotency-Key is still in progress'}), 409
+
+def _claim(scope, key, request_hash, lease):
+    """Insert the in-progress row; returns (True, None) if we own the key, else (False, existing row)"""
+    now = datetime.utcnow()
+    # An expired key, or the lease of a request whose worker died, is simply free again
+    db.session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.expires_at < now
+        ),
+        execution_options=_no_sync
+    )
+    db.session.add(IdempotencyKey(scope=scope, key=key, request_hash=request_hash, expires_at=now + lease))
+    try:
+        db.session.commit()
+        return True, None
+    except IntegrityError:
+        db.session.rollback()
+    return False, db.session.get(IdempotencyKey, (scope, key), populate_existing=True)
+
+def _wait_for(scope, key, timeout):
+    """Wait until another request with the same key has finished; returns its row or None"""
+    deadline = time.monotonic() + timeout
+    delay = 0.02
+    while True:
+        event = _inflight.get((scope, key))
+        remaining = deadline - time.monotonic()
+        if event is not None and remaining > 0:
+            event.wait(remaining)
+        db.session.rollback()
+        record = db.session.get(IdempotencyKey, (scope, key), populate_existing=True)
+        if record is None or record.response_status is not None or time.monotonic() >= deadline:
+            return record
+        time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, 0.5)
+
+def idempotent(view):
+    """Honor an Idempotency-Key header on a mutating view.
+
+    The first request with a key runs normally and its response, headers
+    included, is stored for IDEMPOTENCY_TTL. Replays get the stored response
+    back; a replay that arrives while the first request is still running
+    waits for it (up to IDEMPOTENCY_WAIT seconds). Reusing a key for a
+    different request is a 422. Server errors are not stored, so they can be
+    retried. The key is only held for IDEMPOTENCY_LEASE while the first
+    request runs, so a worker that dies mid-request frees it soon after.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'success': False, 'error': 'Idempotency-Key is too long'}), 400
+
+        scope = request.endpoint
+        request_hash = _request_hash()
+        ttl = current_app.config.get('IDEMPOTENCY_TTL', timedelta(hours=24))
+        lease = current_app.config.get('IDEMPOTENCY_LEASE', timedelta(seconds=60))
+
+        # A key released by a failed first attempt can be claimed again
+        for _ in range(3):
+            owned, record = _claim(scope, key, request_hash, lease)
+            if owned:
+                break
+            if record is not None and record.response_status is None:
+                record = _wait_for(scope, key, current_app.config.get('IDEMPOTENCY_WAIT', 10.0))
+            if record is not None:
+                break
+        else:
+            return _in_progress()
+
+        if not owned:
+            if record.request_hash != request_hash:
+                return jsonify({'success': False, 'error': 'Idempotency-Key was already used for a different request'}), 422
+            if record.response_status is None:
+                return _in_progress()
+            return _replay(record)
+
+        event = threading.Event()
+        with _inflight_lock:
+            _inflight[(scope, key)] = event
+        try:
+            response = make_response(view(*args, **kwargs))
+            db.session.rollback()
+            if response.status_code >= 500 or response.is_streamed:
+                db.session.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key),
+                    execution_options=_no_sync
+                )
+            else:
+                db.session.execute(
+                    update(IdempotencyKey).where(
+                        IdempotencyKey.scope == scope, IdempotencyKey.key == key
+                    ).values(
+                        response_status=response.status_code,
+                        response_type=response.content_type,
+                        response_headers=_stored_headers(response),
+                        response_body=zlib.compress(response.get_data()),
+                        expires_at=datetime.utcnow() + ttl
+                    ),
+                    execution_options=_no_sync
+                )
+            db.session.commit()
+            return response
+        except Exception:
+            db.session.rollback()
+            db.session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key),
+                execution_options=_no_sync
+            )
+            db.session.commit()
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop((scope, key), None)
+            event.set()
+
+    return wrapper
+
+def purge_expired_keys(batch_size=1000):
+    """Delete expired idempotency keys in small batches"""
+    purged = 0
+    while True:
+        now = datetime.utcnow()
+        expired = select(IdempotencyKey.scope, IdempotencyKey.key).where(
+            IdempotencyKey.expires_at < now
+        ).limit(batch_size)
+        deleted = db.session.execute(
+            delete(IdempotencyKey).where(
+                tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(expired)
+            ),
+            execution_options=_no_sync
+        ).rowcount
+        db.session.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
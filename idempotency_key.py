@@ -0,0 +1,16 @@
+from src.models.user import db
+
+class IdempotencyKey(db.Model):
+    """The outcome of a mutating request, replayed when its key is sent again"""
+    __tablename__ = 'idempotency_keys'
+    scope = db.Column(db.String(100), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.LargeBinary(32), nullable=False)
+    # NULL while the first request is still running
+    response_status = db.Column(db.SmallInteger)
+    response_type = db.Column(db.String(100))
+    # [name, value] pairs, so repeated headers such as Set-Cookie survive
+    response_headers = db.Column(db.JSON)
+    response_body = db.Column(db.LargeBinary)
+    # A short lease while the first request runs, then the full TTL
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
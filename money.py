@@ -0,0 +1,140 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import total_ordering
+from sqlalchemy import bindparam, event, func, inspect, select, text, update
+
+KOBO_PER_NAIRA = 100
+
+@total_ordering
+class Money:
+    """An exact naira amount held as integer kobo"""
+    __slots__ = ('kobo',)
+
+    def __init__(self, kobo):
+        if isinstance(kobo, float):
+            raise TypeError('Money takes integer kobo; use Money.from_naira for float amounts')
+        self.kobo = int(kobo)
+
+    @classmethod
+    def from_naira(cls, amount):
+        """Convert a naira amount (int, float, str or Decimal) rounding half up to the kobo"""
+        try:
+            kobo = (Decimal(str(amount)) * KOBO_PER_NAIRA).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            raise ValueError(f'Invalid amount: {amount!r}')
+        return cls(int(kobo))
+
+    @classmethod
+    def optional(cls, kobo):
+        return None if kobo is None else cls(kobo)
+
+    @property
+    def naira(self):
+        """The amount in naira for JSON responses"""
+        return self.kobo / KOBO_PER_NAIRA
+
+    def discount_from(self, original):
+        """Whole-percent discount of this price against ``original``, or None"""
+        if original is None or original.kobo <= self.kobo:
+            return None
+        # round(100 * (original - price) / original) in integers, half up
+        return (200 * (original.kobo - self.kobo) + original.kobo) // (2 * original.kobo)
+
+    def __add__(self, other):
+        return Money(self.kobo + other.kobo)
+
+    def __sub__(self, other):
+        return Money(self.kobo - other.kobo)
+
+    def __mul__(self, quantity):
+        return Money(self.kobo * int(quantity))
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        return isinstance(other, Money) and self.kobo == other.kobo
+
+    def __lt__(self, other):
+        return self.kobo < other.kobo
+
+    def __hash__(self):
+        return hash(self.kobo)
+
+    def __repr__(self):
+        return f'Money({self.kobo})'
+
+def money_fields(product):
+    """Price fields of a product computed from its kobo columns"""
+    price = Money.optional(product.price_kobo)
+    original_price = Money.optional(product.original_price_kobo)
+    return {
+        'price': price.naira if price else None,
+        'original_price': original_price.naira if original_price else None,
+        'price_kobo': product.price_kobo,
+        'original_price_kobo': product.original_price_kobo,
+        'discount_percentage': price.discount_from(original_price) if price else None
+    }
+
+def sync_money_columns(model):
+    """Keep the legacy float price columns and the kobo columns in step on flush.
+
+    Kobo values win when both were set; writers that still only set the float
+    columns get their kobo values derived.
+    """
+    def sync(mapper, connection, target):
+        state = inspect(target)
+        for name in ('price', 'original_price'):
+            kobo_name = f'{name}_kobo'
+            kobo = getattr(target, kobo_name)
+            if state.attrs[kobo_name].history.has_changes() or (kobo is not None and getattr(target, name) is None):
+                setattr(target, name, None if kobo is None else kobo / KOBO_PER_NAIRA)
+            elif state.attrs[name].history.has_changes() or kobo is None:
+                value = getattr(target, name)
+                setattr(target, kobo_name, None if value is None else Money.from_naira(value).kobo)
+
+    event.listen(model, 'before_insert', sync)
+    event.listen(model, 'before_update', sync)
+
+def migrate_money_columns(session, table, chunk_size=1000, progress=None):
+    """Add the kobo columns to an existing table and backfill them in id chunks.
+
+    Each chunk is its own short transaction, so the writer lock is released
+    between chunks. Only rows whose kobo price is still NULL are touched, so
+    the migration can be re-run safely. Values are rounded by
+    ``Money.from_naira``, the same as the flush hook, rather than by the
+    database's float round(). Returns the number of rows migrated.
+    """
+    bind = session.get_bind()
+    existing = {column['name'] for column in inspect(bind).get_columns(table.name)}
+    for name in ('price_kobo', 'original_price_kobo'):
+        if name not in existing:
+            session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} BIGINT'))
+    session.commit()
+
+    migrated = 0
+    last_id = 0
+    max_id = session.scalar(select(func.max(table.c.id))) or 0
+    backfill = update(table).where(table.c.id == bindparam('row_id')).values(
+        price_kobo=bindparam('kobo'), original_price_kobo=bindparam('original_kobo')
+    )
+    while last_id < max_id:
+        upper = last_id + chunk_size
+        rows = session.execute(
+            select(table.c.id, table.c.price, table.c.original_price).where(
+                table.c.id > last_id, table.c.id <= upper, table.c.price_kobo.is_(None)
+            )
+        ).all()
+        if rows:
+            session.execute(backfill, [{
+                'row_id': row.id,
+                'kobo': None if row.price is None else Money.from_naira(row.price).kobo,
+                'original_kobo': None if row.original_price is None else Money.from_naira(row.original_price).kobo
+            } for row in rows])
+        session.commit()
+        migrated += len(rows)
+        last_id = upper
+        if progress:
+            progress(migrated, last_id, max_id)
+
+    for index in table.indexes:
+        index.create(bind, checkfirst=True)
+    return migrated
@@ -0,0 +1,47 @@
+from datetime import datetime
+from src.models.user import db
+from src.services.money import Money
+
+class Order(db.Model):
+    __tablename__ = 'orders'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='placed')
+    total_kobo = db.Column(db.BigInteger, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    items = db.relationship('OrderItem', backref='order', lazy=True, order_by='OrderItem.id')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'total': Money(self.total_kobo).naira,
+            'total_kobo': self.total_kobo,
+            'item_count': self.item_count,
+            'items': [item.to_dict() for item in self.items],
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class OrderItem(db.Model):
+    """A product line of an order with its name and price as they were at checkout"""
+    __tablename__ = 'order_items'
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    product_name = db.Column(db.String(200), nullable=False)
+    unit_price_kobo = db.Column(db.BigInteger, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'unit_price': Money(self.unit_price_kobo).naira,
+            'unit_price_kobo': self.unit_price_kobo,
+            'quantity': self.quantity,
+            'line_total_kobo': self.unit_price_kobo * self.quantity
+        }
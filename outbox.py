@@ -0,0 +1,175 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, select, update
+from src.models.user import db
+from src.models.outbox_message import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+_no_sync = {'synchronize_session': False}
+
+_handlers = {}
+
+def outbox_handler(topic):
+    """Register the function that performs the side effect for a topic"""
+    def decorator(func):
+        _handlers[topic] = func
+        return func
+    return decorator
+
+def enqueue(topic, payload):
+    """Add a message to the current transaction; it is only visible once committed"""
+    message = OutboxMessage(topic=topic, payload=payload)
+    db.session.add(message)
+    return message
+
+@outbox_handler('order.placed')
+def log_order_placed(payload):
+    # Stand-in until confirmation emails, stock sync and analytics are wired up
+    logger.info('Order %s placed by user %s for %s kobo',
+                payload.get('order_id'), payload.get('user_id'), payload.get('total_kobo'))
+
+class OutboxDispatcher:
+    """Drains the outbox in batches on a background thread.
+
+    Handlers run on a small thread pool. A failed message is retried with
+    exponential backoff (``base_backoff * 2 ** (attempts - 1)``, capped at
+    ``max_backoff`` seconds) and parked as 'failed' after ``max_attempts``.
+    """
+
+    def __init__(self, app, batch_size=100, poll_interval=1.0, workers=4,
+                 max_attempts=8, base_backoff=2.0, max_backoff=600.0, lease=60.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self._stopped = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def claim(self):
+        """Lease the next batch of due messages; returns (id, topic, payload, attempts) rows"""
+        now = datetime.utcnow()
+        due = select(OutboxMessage.id).where(
+            OutboxMessage.status == 'pending', OutboxMessage.available_at <= now
+        ).order_by(OutboxMessage.id).limit(self.batch_size).scalar_subquery()
+
+        rows = db.session.execute(
+            update(OutboxMessage).where(
+                OutboxMessage.id.in_(due), OutboxMessage.available_at <= now
+            ).values(
+                available_at=now + timedelta(seconds=self.lease),
+                attempts=OutboxMessage.attempts + 1
+            ).returning(
+                OutboxMessage.id, OutboxMessage.topic, OutboxMessage.payload, OutboxMessage.attempts
+            ),
+            execution_options=_no_sync
+        ).all()
+        db.session.commit()
+        return rows
+
+    def _handle(self, row):
+        handler = _handlers.get(row.topic)
+        if handler is None:
+            return f'No handler registered for {row.topic}'
+        try:
+            with self.app.app_context():
+                handler(row.payload)
+        except Exception as e:
+            logger.exception('Outbox message %s (%s) failed', row.id, row.topic)
+            return str(e) or e.__class__.__name__
+        return None
+
+    def dispatch_once(self, pool=None):
+        """Claim and process one batch; returns the number of messages claimed"""
+        with self.app.app_context():
+            rows = self.claim()
+            if not rows:
+                return 0
+
+            if pool is None:
+                errors = [self._handle(row) for row in rows]
+            else:
+                errors = list(pool.map(self._handle, rows))
+
+            done = [row.id for row, error in zip(rows, errors) if error is None]
+            if done:
+                db.session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(done)), execution_options=_no_sync)
+
+            now = datetime.utcnow()
+            for row, error in zip(rows, errors):
+                if error is None:
+                    continue
+                values = {'last_error': error[:1000]}
+                if row.attempts >= self.max_attempts:
+                    values['status'] = 'failed'
+                else:
+                    delay = min(self.base_backoff * 2 ** (row.attempts - 1), self.max_backoff)
+                    values['available_at'] = now + timedelta(seconds=delay)
+                db.session.execute(
+                    update(OutboxMessage).where(OutboxMessage.id == row.id).values(**values),
+                    execution_options=_no_sync
+                )
+            db.session.commit()
+            return len(rows)
+
+    def run(self):
+        """Dispatch until stopped; full batches are followed immediately by the next"""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='outbox') as pool:
+            while not self._stopped.is_set():
+                try:
+                    claimed = self.dispatch_once(pool)
+                except Exception:
+                    logger.exception('Outbox dispatch failed')
+                    claimed = 0
+                if claimed < self.batch_size:
+                    self._stopped.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='outbox-dispatcher', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+def init_outbox(app):
+    """Attach a dispatcher; it runs in-process when OUTBOX_DISPATCHER is enabled"""
+    app.extensions['outbox_dispatcher'] = OutboxDispatcher(
+        app,
+        batch_size=app.config.get('OUTBOX_BATCH_SIZE', 100),
+        poll_interval=app.config.get('OUTBOX_POLL_INTERVAL', 1.0),
+        workers=app.config.get('OUTBOX_WORKERS', 4),
+        max_attempts=app.config.get('OUTBOX_MAX_ATTEMPTS', 8)
+    )
+
+def start_outbox_dispatcher():
+    """Start the in-process dispatcher on first use, once the app is fully set up"""
+    if current_app.config.get('OUTBOX_DISPATCHER', False):
+        current_app.extensions['outbox_dispatcher'].start()
+
+def get_outbox_dispatcher():
+    return current_app.extensions['outbox_dispatcher']
+
+def run_outbox_worker():
+    """Run the dispatcher in the foreground, for a dedicated worker process"""
+    dispatcher = get_outbox_dispatcher()
+    logger.info('Outbox worker started')
+    try:
+        dispatcher.run()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,20 @@
+from datetime import datetime
+from src.models.user import db
+
+class OutboxMessage(db.Model):
+    """A side effect recorded in the same transaction as the change that caused it"""
+    __tablename__ = 'outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Next time the message may be claimed; a claim pushes it forward by the
+    # lease, so a dispatcher that dies mid-batch only delays its messages
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_outbox_status_available_at', 'status', 'available_at'),
+    )
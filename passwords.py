@@ -0,0 +1,115 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already queued, or one took too long"""
+
+def _check_password(password_hash, password):
+    # werkzeug raises ValueError for hashes it cannot parse, such as ones
+    # written by another framework; they simply do not match
+    try:
+        return check_password_hash(password_hash, password)
+    except ValueError:
+        return False
+
+class PasswordHasher:
+    """Runs password hashing and verification on a small process pool.
+
+    A slow KDF is pure CPU; done on a request thread it holds the GIL and
+    stalls every other request in the process. Here it runs in separate
+    processes, so catalog requests keep their latency during a login spike.
+    ``max_pending`` bounds the jobs queued or running; beyond it callers get
+    PasswordHasherBusy instead of piling up behind the pool, as do jobs that
+    take longer than ``timeout`` seconds. ``method`` is the
+    werkzeug hash method and carries the work factor (e.g.
+    ``scrypt:32768:8:1`` or ``pbkdf2:sha256:1000000``).
+    """
+
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=64, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _submit(self, func, *args, wait=False):
+        if not self._slots.acquire(blocking=wait):
+            raise PasswordHasherBusy('Too many password operations in progress')
+        try:
+            if self._pool is None:
+                with self._pool_lock:
+                    if self._pool is None:
+                        # spawn, not fork: forking a process that runs request
+                        # and background threads can copy a held lock
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                        )
+                        atexit.register(self.close)
+            future = self._pool.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future):
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy('Password operation timed out')
+
+    def hash(self, password):
+        return self._result(self._submit(generate_password_hash, password, self.method))
+
+    def hash_many(self, passwords):
+        """Hash a batch in parallel, for imports: waits for free slots instead of failing"""
+        futures = [self._submit(generate_password_hash, password, self.method, wait=True) for password in passwords]
+        return [future.result() for future in futures]
+
+    def verify(self, password_hash, password):
+        if not password_hash or password is None:
+            return False
+        return self._result(self._submit(_check_password, password_hash, password))
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with another method or work factor"""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+def init_password_hasher(app):
+    """Attach the hasher; several blueprints call this, the first one wins"""
+    if 'password_hasher' in app.extensions:
+        return
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 64),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+    )
+
+def get_password_hasher():
+    return current_app.extensions['password_hasher']
+
+def authenticate(user, password):
+    """Check a user's password off-thread, upgrading an outdated hash on success.
+
+    The caller commits; an upgraded hash is only stored with that commit.
+    Raises PasswordHasherBusy when the pool is saturated or too slow.
+    """
+    if user is None:
+        return False
+    hasher = get_password_hasher()
+    if not hasher.verify(user.password_hash, password):
+        return False
+    if hasher.needs_rehash(user.password_hash):
+        user.password_hash = hasher.hash(password)
+    return True
@@ -1,51 +1,67 @@
-from flask import Blueprint, jsonify, request
+import click
+from datetime import timedelta
+from functools import wraps
+from flask import Blueprint, current_app, jsonify, request
 from src.models.user import db
-from src.models.product import Product, Category, Cart
-from sqlalchemy import or_
+from src.models.product import Category, Cart
+from src.models.product_schema import Product
+from src.services.cart_ops import (
+    add_items, set_quantities, remove_items, load_cart, ensure_cart_unique_index
+)
+from src.services.cart_buffer import init_cart_buffer, get_cart_buffer
+from src.services.idempotency import idempotent, purge_expired_keys
+from src.services.outbox import init_outbox, start_outbox_dispatcher, run_outbox_worker
+from src.services.checkout import checkout_cart, CheckoutError
+from src.services.flash_sale import init_flash_sales, start_flash_sales
+from src.services.stock import (
+    reservations_enabled, reserve_stock, release_stock, adjust_reservation, release_expired_reservations
+)
+from src.services.money import Money, money_fields, migrate_money_columns
+from src.services.guest_cart import GuestCart, GuestCartFull
+from src.services.tokens import token_user_id
+from src.services.rate_limit import init_rate_limiter, rate_limit, by_user_or_ip
+from src.services.user_import import read_records
+from src.services.product_import import import_products
+from src.services.product_filters import product_filters
+from src.services.product_archive import purge_archived_products
+from src.services.dashboard_stats import refresh_stats
+from src.services.catalog_generator import generate_catalog
+from src.services.passwords import init_password_hasher, get_password_hasher
 
 product_bp = Blueprint('product', __name__)
 
+@product_bp.record_once
+def _setup_background_services(state):
+    init_cart_buffer(state.app)
+    init_outbox(state.app)
+    init_flash_sales(state.app)
+    init_rate_limiter(state.app)
+
+@product_bp.before_app_request
+def _start_background_workers():
+    start_outbox_dispatcher()
+    start_flash_sales()
+
+def _product_dict(product):
+    """Serialize a product with prices and discount taken from the kobo columns"""
+    return {**product.to_dict(), **money_fields(product)}
+
 @product_bp.route('/products', methods=['GET'])
 def get_products():
     """Get all products with optional filtering"""
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        category_id = request.args.get('category_id', type=int)
-        search = request.args.get('search', '')
-        featured = request.args.get('featured', type=bool)
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
         sort_by = request.args.get('sort_by', 'created_at')  # name, price, rating, created_at
         sort_order = request.args.get('sort_order', 'desc')  # asc, desc
         
-        query = Product.query.filter(Product.is_active == True)
-        
-        # Apply filters
-        if category_id:
-            query = query.filter(Product.category_id == category_id)
-        
-        if search:
-            query = query.filter(or_(
-                Product.name.contains(search),
-                Product.description.contains(search),
-                Product.brand.contains(search)
-            ))
-        
-        if featured is not None:
-            query = query.filter(Product.is_featured == featured)
-        
-        if min_price is not None:
-            query = query.filter(Product.price >= min_price)
-        
-        if max_price is not None:
-            query = query.filter(Product.price <= max_price)
+        query = Product.query.filter(Product.is_active == True, *product_filters(request.args))
         
         # Apply sorting
         if sort_by == 'name':
             query = query.order_by(Product.name.asc() if sort_order == 'asc' else Product.name.desc())
         elif sort_by == 'price':
-            query = query.order_by(Product.price.asc() if sort_order == 'asc' else Product.price.desc())
+            query = query.order_by(Product.price_kobo.asc() if sort_order == 'asc' else Product.price_kobo.desc())
         elif sort_by == 'rating':
             query = query.order_by(Product.rating.asc() if sort_order == 'asc' else Product.rating.desc())
         else:  # created_at
@@ -60,7 +76,7 @@ def get_products():
         
         return jsonify({
             'success': True,
-            'products': [product.to_dict() for product in products.items],
+            'products': [_product_dict(product) for product in products.items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -85,7 +101,7 @@ def get_product(product_id):
         
         return jsonify({
             'success': True,
-            'product': product.to_dict()
+            'product': _product_dict(product)
         })
     
     except Exception as e:
@@ -105,59 +121,203 @@ def get_categories():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _parse_id(value):
+    """A positive integer id from JSON (an int or a string of digits), else None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value)
+    return value if isinstance(value, int) and value > 0 else None
+
+def _parse_quantity(value, minimum=1):
+    """A JSON integer of at least ``minimum``, else None; booleans are rejected"""
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        return None
+    return value
+
+def _cart_user_id():
+    """Return the signed-in user's id, or None for a guest"""
+    return token_user_id()
+
+def cart_owner_required(func):
+    """401 for anonymous cart requests unless guest carts are enabled"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if token_user_id() is None and not current_app.config.get('GUEST_CARTS', False):
+            return jsonify({'success': False, 'error': 'Authentication required'}), 401
+        return func(*args, **kwargs)
+    return wrapper
+
+def _cart_state(user_id):
+    """Serialize a user's cart the way GET /cart returns it"""
+    cart_items, total_kobo, count = load_cart(user_id)
+    items = [{**item.to_dict(), 'product': _product_dict(item.product)} for item in cart_items]
+    
+    # Read our own writes: apply quantities still held by the write-behind buffer
+    buffer = get_cart_buffer()
+    pending = buffer.pending_for(user_id) if buffer else {}
+    if pending:
+        for item, data in zip(cart_items, items):
+            if item.id in pending:
+                total_kobo += (pending[item.id] - item.quantity) * item.product.price_kobo
+                data['quantity'] = pending[item.id]
+        items = [data for data in items if data['quantity']]
+        count = len(items)
+    
+    total = Money(total_kobo)
+    return {
+        'cart_items': items,
+        'total': total.naira,
+        'total_kobo': total.kobo,
+        'count': count
+    }
+
+def _stock_error(product_ids):
+    """404 for products that are gone, otherwise 409 for stock that ran out"""
+    available = {product_id for (product_id,) in db.session.query(Product.id).filter(
+        Product.id.in_(product_ids), Product.is_active == True
+    )}
+    if not available:
+        return jsonify({'success': False, 'error': 'Product not found'}), 404
+    return jsonify({
+        'success': False,
+        'error': 'Insufficient stock',
+        'product_ids': sorted(available)
+    }), 409
+
+def _reserve_cart_changes(user_id, adds, updates, removes):
+    """Move reservations along with a PATCH /cart batch; returns product ids that fell short"""
+    short = []
+    changed = list(updates) + list(removes)
+    lines = Cart.query.filter(Cart.user_id == user_id, Cart.id.in_(changed)).all() if changed else []
+    for line in lines:
+        new_quantity = 0 if line.id in removes else updates[line.id]
+        if not adjust_reservation(user_id, line.product_id, line.quantity, new_quantity):
+            short.append(line.product_id)
+    for product_id, quantity in adds.items():
+        if not reserve_stock(user_id, product_id, quantity):
+            short.append(product_id)
+    return short
+
+def _flush_buffered_quantities(user_id):
+    """Write a user's buffered quantity changes before mutating the cart directly"""
+    buffer = get_cart_buffer()
+    if buffer:
+        buffer.flush_user(user_id)
+
+def _parse_cart_operations(operations):
+    """Collapse a PATCH /cart batch into (adds, updates, removes)"""
+    # Adds of the same product are summed and an update to 0 becomes a
+    # removal. Operations are not applied in request order, so a batch that
+    # touches the same item twice is rejected rather than guessed at
+    adds, updates, removes = {}, {}, set()
+    touched = {}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise ValueError(f'Unknown operation at index {index}')
+        
+        op = operation.get('op')
+        
+        if op == 'add':
+            product_id = _parse_id(operation.get('product_id'))
+            quantity = _parse_quantity(operation.get('quantity', 1))
+            if product_id is None or quantity is None:
+                raise ValueError(f'Invalid add operation at index {index}')
+            adds[product_id] = adds.get(product_id, 0) + quantity
+            continue
+        
+        item_id = _parse_id(operation.get('item_id'))
+        if op == 'update':
+            quantity = _parse_quantity(operation.get('quantity'), minimum=0)
+            if item_id is None or quantity is None:
+                raise ValueError(f'Invalid update operation at index {index}')
+        elif op == 'remove':
+            if item_id is None:
+                raise ValueError(f'Invalid remove operation at index {index}')
+            quantity = 0
+        else:
+            raise ValueError(f'Unknown operation at index {index}')
+        
+        if item_id in touched:
+            raise ValueError(f'Operations at index {touched[item_id]} and {index} both change item {item_id}')
+        touched[item_id] = index
+        if quantity == 0:
+            removes.add(item_id)
+        else:
+            updates[item_id] = quantity
+    
+    return adds, updates, removes
+
+def _conflicting_adds(user_id, adds, item_ids):
+    """Product ids that a batch both adds and changes through an item id"""
+    if not adds or not item_ids:
+        return []
+    if user_id is None:
+        # A guest's item id is the product id
+        return sorted(set(adds) & set(item_ids))
+    return sorted(product_id for (product_id,) in db.session.query(Cart.product_id).filter(
+        Cart.user_id == user_id, Cart.id.in_(list(item_ids)), Cart.product_id.in_(list(adds))
+    ))
+
 @product_bp.route('/cart', methods=['GET'])
+@cart_owner_required
 def get_cart():
     """Get user's cart items"""
     try:
-        # For demo purposes, using user_id = 1
-        # In a real app, you'd get this from authentication
-        user_id = 1
-        
-        cart_items = Cart.query.filter_by(user_id=user_id).all()
+        user_id = _cart_user_id()
         
-        total = sum(item.product.price * item.quantity for item in cart_items if item.product)
+        if user_id is None:
+            return jsonify({'success': True, **GuestCart.load().state()})
         
-        return jsonify({
-            'success': True,
-            'cart_items': [item.to_dict() for item in cart_items],
-            'total': total,
-            'count': len(cart_items)
-        })
+        return jsonify({'success': True, **_cart_state(user_id)})
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @product_bp.route('/cart', methods=['POST'])
+@rate_limit('cart-add', limit=30, per=10, key=by_user_or_ip)
+@cart_owner_required
+@idempotent
 def add_to_cart():
     """Add item to cart"""
     try:
         data = request.get_json()
-        product_id = data.get('product_id')
-        quantity = data.get('quantity', 1)
+        product_id = _parse_id(data.get('product_id'))
+        quantity = _parse_quantity(data.get('quantity', 1))
         
         if not product_id:
-            return jsonify({'success': False, 'error': 'Product ID is required'}), 400
+            return jsonify({'success': False, 'error': 'A valid product ID is required'}), 400
         
-        # Check if product exists
-        product = Product.query.filter_by(id=product_id, is_active=True).first()
-        if not product:
-            return jsonify({'success': False, 'error': 'Product not found'}), 404
+        if quantity is None:
+            return jsonify({'success': False, 'error': 'Valid quantity is required'}), 400
         
-        # For demo purposes, using user_id = 1
-        user_id = 1
+        user_id = _cart_user_id()
         
-        # Check if item already in cart
-        existing_item = Cart.query.filter_by(user_id=user_id, product_id=product_id).first()
+        if user_id is None:
+            # Guests only read the product; the cart lives in their cookie
+            if not Product.query.filter_by(id=product_id, is_active=True).first():
+                return jsonify({'success': False, 'error': 'Product not found'}), 404
+            
+            cart = GuestCart.load()
+            cart.add(product_id, quantity)
+            return cart.save(jsonify({
+                'success': True,
+                'message': 'Item added to cart successfully'
+            }))
         
-        if existing_item:
-            existing_item.quantity += quantity
-        else:
-            cart_item = Cart(
-                user_id=user_id,
-                product_id=product_id,
-                quantity=quantity
-            )
-            db.session.add(cart_item)
+        _flush_buffered_quantities(user_id)
+        
+        # Hold the stock first; the conditional decrement fails when the
+        # product is missing, inactive or sold out
+        if reservations_enabled() and not reserve_stock(user_id, product_id, quantity):
+            db.session.rollback()
+            return _stock_error([product_id])
+        
+        # Insert or increment in a single upsert; no row is written when the
+        # product does not exist or is inactive
+        if not add_items(user_id, {product_id: quantity}):
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Product not found'}), 404
         
         db.session.commit()
         
@@ -166,27 +326,59 @@ def add_to_cart():
             'message': 'Item added to cart successfully'
         })
     
+    except GuestCartFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @product_bp.route('/cart/<int:item_id>', methods=['PUT'])
+@cart_owner_required
 def update_cart_item(item_id):
     """Update cart item quantity"""
     try:
         data = request.get_json()
-        quantity = data.get('quantity')
+        quantity = _parse_quantity(data.get('quantity'), minimum=0)
         
-        if quantity is None or quantity < 0:
+        if quantity is None:
             return jsonify({'success': False, 'error': 'Valid quantity is required'}), 400
         
-        # For demo purposes, using user_id = 1
-        user_id = 1
+        user_id = _cart_user_id()
+        
+        if user_id is None:
+            cart = GuestCart.load()
+            if not cart.set(item_id, quantity):
+                return jsonify({'success': False, 'error': 'Cart item not found'}), 404
+            return cart.save(jsonify({
+                'success': True,
+                'message': 'Cart updated successfully'
+            }))
         
         cart_item = Cart.query.filter_by(id=item_id, user_id=user_id).first()
         if not cart_item:
             return jsonify({'success': False, 'error': 'Cart item not found'}), 404
         
+        buffer = get_cart_buffer()
+        
+        # Stock follows the quantity synchronously, even when the quantity
+        # itself is buffered, so availability is never overstated
+        if reservations_enabled():
+            current = buffer.pending_for(user_id).get(item_id, cart_item.quantity) if buffer else cart_item.quantity
+            if not adjust_reservation(user_id, cart_item.product_id, current, quantity):
+                db.session.rollback()
+                return _stock_error([cart_item.product_id])
+        
+        # With write-behind enabled the change is acknowledged now and
+        # coalesced with later taps before it is written
+        if buffer:
+            db.session.commit()
+            buffer.put(user_id, item_id, quantity)
+            return jsonify({
+                'success': True,
+                'message': 'Cart updated successfully'
+            })
+        
         if quantity == 0:
             db.session.delete(cart_item)
         else:
@@ -204,16 +396,30 @@ def update_cart_item(item_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @product_bp.route('/cart/<int:item_id>', methods=['DELETE'])
+@cart_owner_required
 def remove_from_cart(item_id):
     """Remove item from cart"""
     try:
-        # For demo purposes, using user_id = 1
-        user_id = 1
+        user_id = _cart_user_id()
+        
+        if user_id is None:
+            cart = GuestCart.load()
+            if not cart.remove(item_id):
+                return jsonify({'success': False, 'error': 'Cart item not found'}), 404
+            return cart.save(jsonify({
+                'success': True,
+                'message': 'Item removed from cart successfully'
+            }))
+        
+        _flush_buffered_quantities(user_id)
         
         cart_item = Cart.query.filter_by(id=item_id, user_id=user_id).first()
         if not cart_item:
             return jsonify({'success': False, 'error': 'Cart item not found'}), 404
         
+        if reservations_enabled():
+            release_stock(user_id, cart_item.product_id, cart_item.quantity)
+        
         db.session.delete(cart_item)
         db.session.commit()
         
@@ -226,3 +432,188 @@ def remove_from_cart(item_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@product_bp.route('/cart', methods=['PATCH'])
+@rate_limit('cart-batch', limit=30, per=10, key=by_user_or_ip)
+@cart_owner_required
+def batch_update_cart():
+    """Apply a batch of add/update/remove cart operations in one transaction"""
+    try:
+        data = request.get_json()
+        operations = data.get('operations') if isinstance(data, dict) else None
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'error': 'A list of operations is required'}), 400
+        
+        try:
+            adds, updates, removes = _parse_cart_operations(operations)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        user_id = _cart_user_id()
+        
+        conflicts = _conflicting_adds(user_id, adds, list(updates) + list(removes))
+        if conflicts:
+            return jsonify({
+                'success': False,
+                'error': 'A batch cannot both add a product and change its cart item',
+                'product_ids': conflicts
+            }), 400
+        
+        if user_id is None:
+            cart = GuestCart.load()
+            removed = sum(cart.remove(item_id) for item_id in removes)
+            updated = sum(cart.set(item_id, quantity) for item_id, quantity in updates.items())
+            
+            active_ids = [product_id for (product_id,) in db.session.query(Product.id).filter(
+                Product.id.in_(list(adds)), Product.is_active == True
+            )] if adds else []
+            for product_id in active_ids:
+                cart.add(product_id, adds[product_id])
+            
+            return cart.save(jsonify({
+                'success': True,
+                'applied': {'added': len(active_ids), 'updated': updated, 'removed': removed},
+                **cart.state()
+            }))
+        
+        _flush_buffered_quantities(user_id)
+        
+        if reservations_enabled():
+            short = _reserve_cart_changes(user_id, adds, updates, removes)
+            if short:
+                db.session.rollback()
+                return _stock_error(short)
+        
+        removed = remove_items(user_id, list(removes))
+        updated = set_quantities(user_id, updates)
+        added = add_items(user_id, adds)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'applied': {'added': added, 'updated': updated, 'removed': removed},
+            **_cart_state(user_id)
+        })
+    
+    except GuestCartFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@product_bp.route('/checkout', methods=['POST'])
+@rate_limit('checkout', limit=10, per=60, key=by_user_or_ip)
+def checkout():
+    """Convert the signed-in user's cart into an order; guests must sign in first"""
+    try:
+        user_id = token_user_id()
+        
+        if user_id is None:
+            return jsonify({'success': False, 'error': 'Sign in to check out'}), 401
+        
+        _flush_buffered_quantities(user_id)
+        
+        order = checkout_cart(user_id)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'order': order.to_dict()
+        }), 201
+    
+    except CheckoutError as e:
+        db.session.rollback()
+        error = {'success': False, 'error': str(e)}
+        if e.product_ids:
+            error['product_ids'] = e.product_ids
+        return jsonify(error), e.status
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@product_bp.cli.command('outbox-worker')
+def outbox_worker_command():
+    """Deliver outbox messages from a dedicated process"""
+    run_outbox_worker()
+
+@product_bp.cli.command('purge-idempotency-keys')
+@click.option('--batch-size', default=1000, show_default=True, help='Keys deleted per transaction')
+def purge_idempotency_keys_command(batch_size):
+    """Delete expired Idempotency-Key records"""
+    purged = purge_expired_keys(batch_size=batch_size)
+    click.echo(f'Purged {purged} expired idempotency keys')
+
+@product_bp.cli.command('migrate-money')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows updated per transaction')
+def migrate_money_command(chunk_size):
+    """Add and backfill the integer kobo price columns"""
+    def report(migrated, last_id, max_id):
+        click.echo(f'{migrated} products migrated (ids up to {min(last_id, max_id)} of {max_id})')
+    
+    migrated = migrate_money_columns(db.session, Product.__table__, chunk_size=chunk_size, progress=report)
+    click.echo(f'Done: {migrated} products migrated')
+
+@product_bp.cli.command('release-reservations')
+@click.option('--batch-size', default=500, show_default=True, help='Reservations released per transaction')
+def release_reservations_command(batch_size):
+    """Return stock held by expired cart reservations"""
+    released = release_expired_reservations(batch_size=batch_size)
+    click.echo(f'Released {released} expired reservations')
+
+@product_bp.cli.command('ensure-cart-index')
+def ensure_cart_index_command():
+    """Merge duplicate cart rows and create the (user_id, product_id) unique index"""
+    removed = ensure_cart_unique_index()
+    click.echo(f'Merged {removed} duplicate cart rows')
+
+@product_bp.cli.command('import-products')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='defaults to the file extension')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows validated and written per transaction')
+def import_products_command(path, fmt, chunk_size):
+    """Create or update products, matched by name, from a CSV or NDJSON file"""
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    def report(progress):
+        click.echo(f"{progress['created']} created, {progress['updated']} updated, {progress['failed']} failed")
+
+    with open(path, 'rb') as stream:
+        result = import_products(read_records(stream, fmt), chunk_size=chunk_size, progress=report)
+    for error in result['errors']:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(f"Done: {result['created']} created, {result['updated']} updated, {result['failed']} failed")
+
+@product_bp.cli.command('purge-archived')
+@click.option('--days', default=90, show_default=True, help='Only purge products archived at least this long ago')
+@click.option('--batch-size', default=100, show_default=True, help='Products deleted per transaction')
+def purge_archived_command(days, batch_size):
+    """Hard-delete long-archived products that no order refers to"""
+    purged = purge_archived_products(older_than=timedelta(days=days), batch_size=batch_size)
+    click.echo(f'Purged {purged} archived products')
+
+@product_bp.cli.command('refresh-stats')
+def refresh_stats_command():
+    """Recompute the admin dashboard rollups; schedule this once, not per web worker"""
+    refresh_stats()
+    click.echo('Dashboard stats refreshed')
+
+@product_bp.cli.command('generate-catalog')
+@click.option('--categories', default=50, show_default=True, type=click.IntRange(min=1))
+@click.option('--products', default=100000, show_default=True, type=click.IntRange(min=0))
+@click.option('--users', default=10000, show_default=True, type=click.IntRange(min=0))
+@click.option('--carts', default=10000, show_default=True, type=click.IntRange(min=0), help='Users given a cart')
+@click.option('--seed', default=1, show_default=True, help='Same seed and counts, same data')
+@click.option('--password', help='Password for every generated user; without it they cannot log in')
+@click.option('--chunk-size', default=50000, show_default=True, help='Rows inserted per transaction')
+def generate_catalog_command(categories, products, users, carts, seed, password, chunk_size):
+    """Fill the database with a deterministic synthetic catalog for load testing"""
+    password_hash = None
+    if password:
+        init_password_hasher(current_app)
+        password_hash = get_password_hasher().hash(password)
+    def report(table, count):
+        click.echo(f'{count} {table} inserted')
+
+    generate_catalog(categories, products, users, carts, seed=seed, password_hash=password_hash,
+                     chunk_size=chunk_size, progress=report)
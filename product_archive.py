@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, literal, select, update
+from src.models.user import db
+from src.models.product import Cart
+from src.models.product_schema import Product
+from src.models.order import OrderItem
+from src.models.reservation import StockReservation
+from src.models.archive import ProductArchive
+from src.models.sale import FlashSale
+from src.services.cart_ops import upsert_insert
+
+_no_sync = {'synchronize_session': False}
+
+def forget_archive_times(product_ids):
+    """Drop the archive records of products (a list or a SELECT of ids) made active again; the caller commits"""
+    db.session.execute(
+        delete(ProductArchive).where(ProductArchive.product_id.in_(product_ids)),
+        execution_options=_no_sync
+    )
+
+def record_archive_times(clauses, now=None):
+    """Start the purge clock for products matching ``clauses`` before they are deactivated.
+
+    One INSERT ... SELECT records the archive time, keeping the first one for
+    products archived twice. An archive row left on a product that is active
+    again is dropped first, so its clock starts over. Anything that clears
+    is_active calls this first; the caller commits.
+    """
+    now = now or datetime.utcnow()
+    forget_archive_times(select(Product.id).where(*clauses, Product.is_active == True))
+    insert = upsert_insert()
+    db.session.execute(
+        insert(ProductArchive).from_select(
+            ['product_id', 'archived_at'],
+            select(Product.id, literal(now, db.DateTime)).where(*clauses)
+        ).on_conflict_do_nothing(index_elements=[ProductArchive.product_id])
+    )
+
+def archive_products(clauses, now=None):
+    """Hide every product matching ``clauses``; returns how many were active.
+
+    The archive time is recorded, then one UPDATE clears is_active. The
+    caller commits.
+    """
+    record_archive_times(clauses, now)
+    return db.session.execute(
+        update(Product).where(*clauses, Product.is_active == True).values(is_active=False),
+        execution_options=_no_sync
+    ).rowcount
+
+def unarchive_products(clauses):
+    """Bring archived products matching ``clauses`` back; returns how many. The caller commits."""
+    archived = select(ProductArchive.product_id)
+    restored = db.session.execute(
+        update(Product).where(*clauses, Product.id.in_(archived)).values(is_active=True),
+        execution_options=_no_sync
+    ).rowcount
+    forget_archive_times(select(Product.id).where(*clauses))
+    return restored
+
+def purge_archived_products(older_than=timedelta(days=90), batch_size=100, now=None):
+    """Hard-delete products archived before the cutoff, a small batch per transaction.
+
+    Products that appear on an order are kept (archived) for the order
+    history, and so is any product active again, whatever its archive row
+    says. Cart lines, reservations and flash sales for a purged product go
+    with it. Returns the number of products deleted.
+    """
+    cutoff = (now or datetime.utcnow()) - older_than
+    purged = 0
+    while True:
+        batch = db.session.scalars(
+            select(ProductArchive.product_id).join(Product, Product.id == ProductArchive.product_id).where(
+                ProductArchive.archived_at < cutoff,
+                Product.is_active == False,
+                ~exists().where(OrderItem.product_id == ProductArchive.product_id)
+            ).order_by(ProductArchive.archived_at).limit(batch_size)
+        ).all()
+        if not batch:
+            return purged
+
+        for model in (Cart, StockReservation, FlashSale):
+            db.session.execute(delete(model).where(model.product_id.in_(batch)), execution_options=_no_sync)
+        db.session.execute(delete(ProductArchive).where(ProductArchive.product_id.in_(batch)), execution_options=_no_sync)
+        db.session.execute(delete(Product).where(Product.id.in_(batch)), execution_options=_no_sync)
+        db.session.commit()
+        purged += len(batch)
@@ -0,0 +1,89 @@
+import math
+from sqlalchemy import func, select, update
+from src.models.user import db
+from src.models.product_schema import Product
+from src.services.money import Money, KOBO_PER_NAIRA
+from src.services.product_archive import forget_archive_times, record_archive_times
+
+# Attributes that can be set to a plain value, with their validators
+_ATTRIBUTES = {
+    'brand': lambda value: value is None or (isinstance(value, str) and len(value) <= 100),
+    'category_id': lambda value: value is None or (isinstance(value, int) and not isinstance(value, bool)),
+    'is_featured': lambda value: isinstance(value, bool),
+    'is_active': lambda value: isinstance(value, bool),
+    'stock_quantity': lambda value: isinstance(value, int) and not isinstance(value, bool) and value >= 0,
+}
+
+# Largest percentage rise in one update (1000 is eleven times the price)
+MAX_PRICE_PERCENT = 1000
+
+def product_changes(changes):
+    """Turn an update expression into UPDATE ... SET values.
+
+    ``price`` sets an absolute naira price; ``price_percent`` moves every
+    matched price by a percentage (-10 is 10% off), rounded half up to the
+    kobo, in the database. ``preserve_original_price`` first copies the
+    current price into original_price where none is set, so the storefront
+    shows the markdown. Raises ValueError for anything else.
+    """
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError('set must be a non-empty object')
+    unknown = set(changes) - set(_ATTRIBUTES) - {'price', 'price_percent', 'preserve_original_price'}
+    if unknown:
+        raise ValueError(f"Cannot update: {', '.join(sorted(unknown))}")
+    if 'price' in changes and 'price_percent' in changes:
+        raise ValueError('Use either price or price_percent')
+
+    values = {}
+    for name, valid in _ATTRIBUTES.items():
+        if name in changes:
+            if not valid(changes[name]):
+                raise ValueError(f'Invalid value for {name}')
+            values[name] = changes[name]
+
+    price_kobo = None
+    if 'price' in changes:
+        price_kobo = Money.from_naira(changes['price']).kobo
+        if price_kobo < 0:
+            raise ValueError('price must not be negative')
+    elif 'price_percent' in changes:
+        percent = changes['price_percent']
+        if (isinstance(percent, bool) or not isinstance(percent, (int, float))
+                or not math.isfinite(percent) or not -100 <= percent <= MAX_PRICE_PERCENT):
+            raise ValueError(f'price_percent must be a number from -100 to {MAX_PRICE_PERCENT}')
+        # Whole basis points keep the arithmetic in integers on every backend
+        factor = 10000 + round(percent * 100)
+        price_kobo = (Product.price_kobo * factor + 5000) // 10000
+
+    if price_kobo is not None:
+        # Every SET expression sees the old row, so both price columns
+        # derive from the same value (bulk UPDATEs skip the money sync hook)
+        values['price_kobo'] = price_kobo
+        values['price'] = price_kobo / float(KOBO_PER_NAIRA)
+
+    if changes.get('preserve_original_price'):
+        values['original_price_kobo'] = func.coalesce(Product.original_price_kobo, Product.price_kobo)
+        values['original_price'] = func.coalesce(Product.original_price, Product.price)
+    return values
+
+def bulk_update_products(clauses, values, dry_run=False):
+    """Apply ``values`` to every product matching ``clauses`` with one UPDATE.
+
+    Returns the number of products matched (dry run) or updated. The caller
+    commits.
+    """
+    if dry_run:
+        return db.session.scalar(select(func.count()).select_from(Product).where(*clauses))
+    if values.get('is_active') is True:
+        # Reactivated products must not be purged on their old archive time
+        forget_archive_times(select(Product.id).where(*clauses))
+    elif values.get('is_active') is False:
+        # Deactivating is archiving, so the purge job must see when it happened
+        record_archive_times(clauses)
+    # 'fetch' reads back the matched ids (RETURNING where available) so
+    # products already loaded in this session see their new values
+    result = db.session.execute(
+        update(Product).where(*clauses).values(**values),
+        execution_options={'synchronize_session': 'fetch'}
+    )
+    return result.rowcount
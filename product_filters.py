@@ -0,0 +1,72 @@
+from sqlalchemy import or_
+from src.models.product_schema import Product
+from src.services.money import Money
+
+_BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in _BOOLEANS:
+        return _BOOLEANS[value.lower()]
+    raise ValueError
+
+def _parse_int(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError
+    return int(value)
+
+def _parse_text(value):
+    if not isinstance(value, str):
+        raise ValueError
+    return value
+
+def _get(args, name, type, strict):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return type(value)
+    except (TypeError, ValueError):
+        if strict:
+            raise ValueError(f'Invalid value for {name}: {value!r}')
+        return None
+
+def product_filters(args, strict=False):
+    """WHERE clauses for the /products filter vocabulary.
+
+    ``args`` is request.args or a decoded JSON object: category_id, brand,
+    search, featured (true/false/1/0), min_price and max_price (naira).
+    Malformed values, lists included, are ignored, as /products always has;
+    with ``strict`` they raise ValueError instead, for callers where a
+    dropped filter would widen a write.
+    """
+    clauses = []
+    category_id = _get(args, 'category_id', _parse_int, strict)
+    if category_id:
+        clauses.append(Product.category_id == category_id)
+
+    brand = _get(args, 'brand', _parse_text, strict)
+    if brand:
+        clauses.append(Product.brand == brand)
+
+    search = _get(args, 'search', _parse_text, strict)
+    if search:
+        clauses.append(or_(
+            Product.name.contains(search),
+            Product.description.contains(search),
+            Product.brand.contains(search)
+        ))
+
+    featured = _get(args, 'featured', _parse_bool, strict)
+    if featured is not None:
+        clauses.append(Product.is_featured == featured)
+
+    min_price = _get(args, 'min_price', Money.from_naira, strict)
+    if min_price is not None:
+        clauses.append(Product.price_kobo >= min_price.kobo)
+
+    max_price = _get(args, 'max_price', Money.from_naira, strict)
+    if max_price is not None:
+        clauses.append(Product.price_kobo <= max_price.kobo)
+    return clauses
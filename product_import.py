@@ -0,0 +1,163 @@
+from sqlalchemy import insert, select, update
+from src.models.user import db
+from src.models.product import Category
+from src.models.product_schema import Product
+from src.services.money import Money, KOBO_PER_NAIRA
+from src.services.product_archive import forget_archive_times, record_archive_times
+
+MAX_REPORTED_ERRORS = 1000
+
+_TEXT_FIELDS = {'description': None, 'brand': 100, 'image_url': 500}
+
+# Column values for a new product when the record leaves them out
+_NEW_PRODUCT = {
+    'description': None, 'brand': None, 'image_url': None, 'category_id': None,
+    'original_price': None, 'original_price_kobo': None,
+    'stock_quantity': 0, 'is_featured': False, 'is_active': True
+}
+
+def _error(report, row_number, message):
+    report['failed'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'row': row_number, 'error': message})
+
+def _present(record, field):
+    value = record.get(field)
+    return value is not None and not (isinstance(value, str) and not value.strip())
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in ('1', 'true', 'yes'):
+        return True
+    if str(value).strip().lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError
+
+def _validate(record, categories):
+    """Return (column values, None) or (None, error message) for one record.
+
+    Only the columns present in the record are returned, so an update leaves
+    the others alone.
+    """
+    if isinstance(record, str):
+        return None, record
+    name = str(record.get('name') or '').strip()
+    if not name or len(name) > 200:
+        return None, 'name is required and must be at most 200 characters'
+    values = {'name': name}
+
+    try:
+        for field in ('price', 'original_price'):
+            if _present(record, field):
+                amount = Money.from_naira(record[field])
+                if amount.kobo < 0:
+                    raise ValueError
+                # Core statements skip the ORM flush hook, so set both columns
+                values[f'{field}_kobo'] = amount.kobo
+                values[field] = amount.kobo / KOBO_PER_NAIRA
+    except ValueError:
+        return None, 'price and original_price must be non-negative amounts in naira'
+
+    if _present(record, 'category'):
+        category_id = categories.get(str(record['category']).strip().lower())
+        if category_id is None:
+            return None, f"unknown category: {record['category']}"
+        values['category_id'] = category_id
+
+    if _present(record, 'stock_quantity'):
+        try:
+            values['stock_quantity'] = int(record['stock_quantity'])
+        except (TypeError, ValueError):
+            return None, 'stock_quantity must be a whole number'
+        if values['stock_quantity'] < 0:
+            return None, 'stock_quantity must be a whole number'
+
+    for field in ('is_featured', 'is_active'):
+        if _present(record, field):
+            try:
+                values[field] = _parse_bool(record[field])
+            except ValueError:
+                return None, f'{field} must be true or false'
+
+    for field, max_length in _TEXT_FIELDS.items():
+        if _present(record, field):
+            values[field] = str(record[field]).strip()
+            if max_length and len(values[field]) > max_length:
+                return None, f'{field} must be at most {max_length} characters'
+    return values, None
+
+def _import_chunk(chunk, categories, report):
+    rows = {}
+    for row_number, record in chunk:
+        values, error = _validate(record, categories)
+        if error:
+            _error(report, row_number, error)
+        elif values['name'] in rows:
+            _error(report, row_number, 'duplicate product name within the import')
+        else:
+            rows[values['name']] = (row_number, values)
+    if not rows:
+        return
+
+    # One query resolves which names already exist
+    existing = {}
+    for product_id, name in db.session.execute(select(Product.id, Product.name).where(Product.name.in_(list(rows)))):
+        existing.setdefault(name, []).append(product_id)
+
+    inserts = []
+    updates = []
+    for name, (row_number, values) in rows.items():
+        if name in existing:
+            updates.extend({**values, 'id': product_id} for product_id in existing[name])
+        elif 'price_kobo' not in values:
+            _error(report, row_number, 'price is required for a new product')
+        else:
+            # executemany needs the same columns in every row
+            inserts.append({**_NEW_PRODUCT, **values})
+
+    # Lists of parameter sets run as executemany: a bulk INSERT for new
+    # products and an ORM bulk UPDATE by primary key for existing ones
+    # Products imported as inactive are archived, so the purge job needs
+    # their archive times; reactivated ones must not keep an old one
+    if inserts:
+        db.session.execute(insert(Product), inserts)
+        created_archived = [row['name'] for row in inserts if row['is_active'] is False]
+        if created_archived:
+            record_archive_times([Product.name.in_(created_archived)])
+    if updates:
+        deactivated = [row['id'] for row in updates if row.get('is_active') is False]
+        if deactivated:
+            record_archive_times([Product.id.in_(deactivated)])
+        db.session.execute(update(Product), updates)
+        reactivated = [row['id'] for row in updates if row.get('is_active') is True]
+        if reactivated:
+            forget_archive_times(reactivated)
+    report['created'] += len(inserts)
+    report['updated'] += len(updates)
+
+def import_products(records, chunk_size=1000, progress=None):
+    """Create or update products from (row_number, record) pairs, one transaction per chunk.
+
+    Products are matched by name. ``category`` is a category name, resolved
+    through a map loaded once. Invalid rows are reported and skipped.
+    """
+    categories = {name.strip().lower(): category_id for category_id, name in db.session.execute(
+        select(Category.id, Category.name)
+    )}
+    report = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, categories, report)
+            db.session.commit()
+            chunk = []
+            if progress:
+                progress(report)
+    if chunk:
+        _import_chunk(chunk, categories, report)
+        db.session.commit()
+        if progress:
+            progress(report)
+    return report
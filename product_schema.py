@@ -0,0 +1,14 @@
+from src.models.user import db
+from src.models.product import Product
+from src.services.money import sync_money_columns
+
+# Integer kobo prices. They sit next to the legacy float columns until every
+# database has been backfilled with `flask product migrate-money`; reads,
+# filters and totals use these. Import Product from this module so the
+# columns are always there, whichever modules happened to load first.
+Product.price_kobo = db.Column(db.BigInteger)
+Product.original_price_kobo = db.Column(db.BigInteger)
+
+product_price_kobo_index = db.Index('ix_products_price_kobo', Product.price_kobo)
+
+sync_money_columns(Product)
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src.services.tokens import token_user_id
+from src.services.user_email import normalize_email
+
+class MemoryBuckets:
+    """Token buckets held in this process, bounded by an LRU of active keys.
+
+    A key pushed out of the LRU simply starts over with a full bucket, so
+    ``max_keys`` trades memory for how long an idle attacker is remembered.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate, now):
+        """Spend one token; returns (allowed, seconds until the next token)"""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / refill_rate
+
+# Same bucket arithmetic as MemoryBuckets, run atomically inside Redis
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBuckets:
+    """Token buckets shared by every worker through Redis; idle keys expire on their own"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RATE_LIMIT_REDIS_URL is set but the redis package is not installed')
+        self.prefix = prefix
+        self._take = redis.Redis.from_url(url).register_script(_TAKE_SCRIPT)
+
+    def take(self, key, capacity, refill_rate, now):
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[capacity, refill_rate, now])
+        return bool(allowed), 0.0 if allowed else (1 - float(tokens)) / refill_rate
+
+def init_rate_limiter(app):
+    """Attach the bucket store; several blueprints call this, the first one wins.
+
+    Behind a router or load balancer (the Heroku router, for one) every
+    request comes from the proxy's address, so per-IP limits would lump all
+    clients together. PROXY_FIX_X_FOR = n trusts the last n X-Forwarded-For
+    hops and makes request.remote_addr the client's address. Leave it at 0
+    when clients reach the app directly, or they could forge their address.
+    """
+    if 'rate_limiter' in app.extensions:
+        return
+    hops = app.config.get('PROXY_FIX_X_FOR', 0)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops)
+    if app.config.get('RATE_LIMIT_REDIS_URL'):
+        app.extensions['rate_limiter'] = RedisBuckets(app.config['RATE_LIMIT_REDIS_URL'])
+    else:
+        app.extensions['rate_limiter'] = MemoryBuckets(app.config.get('RATE_LIMIT_MAX_KEYS', 10000))
+
+# Key functions only look at the request itself, never the database
+
+def by_ip():
+    return request.remote_addr or 'unknown'
+
+def by_login_email():
+    """The account being signed in to, so one account cannot be tried from many IPs"""
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return normalize_email(email) if isinstance(email, str) and email.strip() else None
+
+def by_user_or_ip():
+    user_id = token_user_id()
+    return f'user:{user_id}' if user_id is not None else f'ip:{by_ip()}'
+
+def rate_limit(scope, limit, per, key=by_ip):
+    """Allow ``limit`` requests per ``per`` seconds for each value of ``key``.
+
+    Token bucket: bursts of up to ``limit`` are fine, after which requests
+    are admitted at the refill rate. Excess requests get a 429 with
+    Retry-After before the view (and any decorator below this one) runs.
+    Stack the decorator to limit on several keys. A key function returning
+    None skips the check; RATE_LIMIT_ENABLED = False turns limiting off.
+    """
+    refill_rate = limit / per
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+                return view(*args, **kwargs)
+            value = key()
+            if value is not None:
+                allowed, retry_after = current_app.extensions['rate_limiter'].take(
+                    f'{scope}:{value}', limit, refill_rate, time.time()
+                )
+                if not allowed:
+                    return (
+                        jsonify({'success': False, 'error': 'Too many requests, please slow down'}),
+                        429,
+                        {'Retry-After': str(max(1, int(retry_after + 0.999)))}
+                    )
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
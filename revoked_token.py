@@ -0,0 +1,7 @@
+from src.models.user import db
+
+class RevokedToken(db.Model):
+    """A token that must be refused before its exp; shared by all workers"""
+    __tablename__ = 'revoked_tokens'
+    token_digest = db.Column(db.LargeBinary(32), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,18 @@
+from src.models.user import db
+
+class FlashSale(db.Model):
+    """A product whose stock is handed out from in-memory counters"""
+    __tablename__ = 'flash_sales'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    # Units a worker pulls from products.stock_quantity per refill
+    block_size = db.Column(db.Integer, nullable=False, default=50)
+
+    def to_dict(self):
+        return {'product_id': self.product_id, 'block_size': self.block_size}
+
+class FlashSaleHold(db.Model):
+    """Units of a product a worker (identified by its journal) has pulled into memory"""
+    __tablename__ = 'flash_sale_holds'
+    journal_id = db.Column(db.String(32), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    held = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,96 @@
+import json
+from itertools import groupby
+from sqlalchemy import insert, select
+from src.services.money import Money
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _insert_many(session, table, rows):
+    """executemany per distinct column set, so omitted columns keep their defaults"""
+    key = lambda row: tuple(sorted(row))
+    for _, group in groupby(sorted(rows, key=key), key=key):
+        session.execute(insert(table), list(group))
+
+def _ensure_categories(session, table, records, ids):
+    """Insert the categories in ``records`` that do not exist yet and add every id to ``ids``"""
+    wanted = {record['name']: record for record in records if record['name'] not in ids}
+    if not wanted:
+        return 0
+    ids.update(session.execute(select(table.c.name, table.c.id).where(table.c.name.in_(list(wanted)))).all())
+    missing = [record for name, record in wanted.items() if name not in ids]
+    if missing:
+        _insert_many(session, table, missing)
+        ids.update(session.execute(
+            select(table.c.name, table.c.id).where(table.c.name.in_([record['name'] for record in missing]))
+        ).all())
+    return len(missing)
+
+def seed_catalog(session, categories_table, products_table, categories=(), products=(), chunk_size=1000):
+    """Idempotently insert categories and products, matched by name.
+
+    Per chunk of products there is one query for the names that already
+    exist and bulk INSERTs for the rest; category ids are resolved from an
+    in-memory map, and a category a product names but the fixture does not
+    list is created on the way. ``products`` may be any iterable, so large
+    fixtures are never loaded whole. Each chunk is committed. Returns counts.
+    """
+    report = {'categories_created': 0, 'products_created': 0, 'products_existing': 0}
+    category_ids = {}
+    report['categories_created'] += _ensure_categories(session, categories_table, list(categories), category_ids)
+    session.commit()
+
+    has_kobo = 'price_kobo' in products_table.c
+    for chunk in _chunks(products, chunk_size):
+        report['categories_created'] += _ensure_categories(
+            session, categories_table, [{'name': record['category']} for record in chunk if record.get('category')],
+            category_ids
+        )
+        names = {record['name'] for record in chunk}
+        existing = set(session.scalars(select(products_table.c.name).where(products_table.c.name.in_(list(names)))))
+
+        rows = []
+        for record in chunk:
+            if record['name'] in existing:
+                report['products_existing'] += 1
+                continue
+            existing.add(record['name'])
+            row = {key: value for key, value in record.items() if key != 'category'}
+            if record.get('category'):
+                row['category_id'] = category_ids[record['category']]
+            if has_kobo:
+                # Core inserts skip the ORM money sync, so fill the kobo columns here
+                for name in ('price', 'original_price'):
+                    if row.get(name) is not None and f'{name}_kobo' not in row:
+                        row[f'{name}_kobo'] = Money.from_naira(row[name]).kobo
+            rows.append(row)
+        if rows:
+            _insert_many(session, products_table, rows)
+        session.commit()
+        report['products_created'] += len(rows)
+    return report
+
+def read_fixture(path):
+    """Return (categories, products) from a fixture file.
+
+    A .json file holds {"categories": [...], "products": [...]}. Any other
+    file is read as NDJSON, one product per line, lazily, so it can be large.
+    """
+    if path.endswith('.json'):
+        with open(path) as fixture:
+            data = json.load(fixture)
+        return data.get('categories', []), data.get('products', [])
+
+    def products():
+        with open(path) as fixture:
+            for line in fixture:
+                if line.strip():
+                    yield json.loads(line)
+    return [], products()
@@ -1,11 +1,13 @@
 import os
 import sys
+import click
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from src.services.money import money_fields, sync_money_columns, migrate_money_columns
+from src.services.seeding import seed_catalog
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -41,6 +43,8 @@ class Product(db.Model):
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
     original_price = db.Column(db.Float)
+    price_kobo = db.Column(db.BigInteger, index=True)
+    original_price_kobo = db.Column(db.BigInteger)
     category_id = db.Column(db.Integer)
     brand = db.Column(db.String(100))
     image_url = db.Column(db.String(500))
@@ -49,29 +53,32 @@ class Product(db.Model):
     is_featured = db.Column(db.Boolean, default=False)
     
     def to_dict(self):
-        discount = None
-        if self.original_price and self.original_price > self.price:
-            discount = round(((self.original_price - self.price) / self.original_price * 100), 0)
-        
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'price': self.price,
-            'original_price': self.original_price,
             'category_id': self.category_id,
             'brand': self.brand,
             'image_url': self.image_url,
             'rating': self.rating,
             'review_count': self.review_count,
             'is_featured': self.is_featured,
-            'discount_percentage': discount
+            **money_fields(self)
         }
 
+sync_money_columns(Product)
+
 # Create tables
 with app.app_context():
     db.create_all()
 
+@app.cli.command('migrate-money')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows updated per transaction')
+def migrate_money_command(chunk_size):
+    """Add and backfill the integer kobo price columns"""
+    migrated = migrate_money_columns(db.session, Product.__table__, chunk_size=chunk_size)
+    click.echo(f'Done: {migrated} products migrated')
+
 # Routes
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -88,10 +95,19 @@ def get_categories():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+_BOOLEANS = {'true': True, '1': True, 'false': False, '0': False}
+
+def _parse_bool(value):
+    # type=bool would read any non-empty string, even 'false', as True;
+    # the ValueError makes request.args.get ignore anything else
+    if value.lower() not in _BOOLEANS:
+        raise ValueError(value)
+    return _BOOLEANS[value.lower()]
+
 @app.route('/api/products', methods=['GET'])
 def get_products():
     try:
-        featured = request.args.get('featured', type=bool)
+        featured = request.args.get('featured', type=_parse_bool)
         category_id = request.args.get('category_id', type=int)
         
         query = Product.query
@@ -137,17 +153,6 @@ def seed_data():
             {'name': 'Automotive', 'description': 'Vehicles and automotive parts', 'icon': 'car'}
         ]
         
-        categories = {}
-        for cat_data in categories_data:
-            existing_cat = Category.query.filter_by(name=cat_data['name']).first()
-            if not existing_cat:
-                category = Category(**cat_data)
-                db.session.add(category)
-                db.session.flush()
-                categories[cat_data['name']] = category.id
-            else:
-                categories[cat_data['name']] = existing_cat.id
-        
         # Create sample products
         products_data = [
             {
@@ -244,17 +249,7 @@ def seed_data():
             }
         ]
         
-        # Add products
-        for product_data in products_data:
-            existing_product = Product.query.filter_by(name=product_data['name']).first()
-            if not existing_product:
-                category_name = product_data.pop('category')
-                product_data['category_id'] = categories[category_name]
-                
-                product = Product(**product_data)
-                db.session.add(product)
-        
-        db.session.commit()
+        seed_catalog(db.session, Category.__table__, Product.__table__, categories_data, products_data)
         
         return jsonify({
             'success': True,
@@ -0,0 +1,36 @@
+from src.models.user import db
+
+class CategoryStats(db.Model):
+    """Per-category product rollup behind /admin/stats"""
+    __tablename__ = 'category_stats'
+    # NULL category_id is stored as 0
+    category_id = db.Column(db.Integer, primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    active_count = db.Column(db.Integer, nullable=False, default=0)
+    featured_count = db.Column(db.Integer, nullable=False, default=0)
+    stock_units = db.Column(db.BigInteger, nullable=False, default=0)
+    inventory_value_kobo = db.Column(db.BigInteger, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'category_id': self.category_id or None,
+            'product_count': self.product_count,
+            'active_count': self.active_count,
+            'featured_count': self.featured_count,
+            'stock_units': self.stock_units,
+            'inventory_value_kobo': self.inventory_value_kobo
+        }
+
+class CartStats(db.Model):
+    """Single-row rollup of carts in progress"""
+    __tablename__ = 'cart_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    carts = db.Column(db.Integer, nullable=False, default=0)
+    lines = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.BigInteger, nullable=False, default=0)
+    value_kobo = db.Column(db.BigInteger, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {'carts': self.carts, 'lines': self.lines, 'units': self.units, 'value_kobo': self.value_kobo}
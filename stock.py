@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, delete, select, update
+from src.models.user import db
+from src.models.product_schema import Product
+from src.models.reservation import StockReservation
+from src.services.cart_ops import upsert_insert
+from src.services.flash_sale import get_flash_sale_inventory, take_flash_sale_stock, release_flash_sale_stock
+
+# Plain UPDATE/DELETE statements; the session's identity map is not consulted
+_no_sync = {'synchronize_session': False}
+
+def reservations_enabled():
+    """True with STOCK_RESERVATIONS, and always while flash sales are running.
+
+    Flash-sale counters are only consulted through reserve_stock, so
+    FLASH_SALES implies reservations rather than leaving sales inert.
+    """
+    return current_app.config.get('STOCK_RESERVATIONS', False) or get_flash_sale_inventory() is not None
+
+def reservation_ttl():
+    return current_app.config.get('STOCK_RESERVATION_TTL', timedelta(minutes=30))
+
+def take_stock(product_id, quantity):
+    """Decrement available stock if enough is left; returns False when short"""
+    # A single conditional UPDATE: the row lock taken by the write is the only
+    # synchronization, so concurrent buyers never need SELECT ... FOR UPDATE
+    result = db.session.execute(
+        update(Product).where(
+            Product.id == product_id,
+            Product.is_active == True,
+            Product.stock_quantity >= quantity
+        ).values(stock_quantity=Product.stock_quantity - quantity),
+        execution_options=_no_sync
+    )
+    return result.rowcount == 1
+
+def return_stock(quantities):
+    """Add {product_id: quantity} back to stock with one UPDATE"""
+    if not quantities:
+        return
+    db.session.execute(
+        update(Product).where(Product.id.in_(quantities)).values(
+            stock_quantity=Product.stock_quantity + case(quantities, value=Product.id)
+        ),
+        execution_options=_no_sync
+    )
+
+def reserve_stock(user_id, product_id, quantity):
+    """Take stock for a cart item and record (or extend) the user's reservation"""
+    # Flash-sale products come out of the in-memory counters instead of the
+    # contended products row
+    taken = take_flash_sale_stock(product_id, quantity)
+    if taken is None:
+        taken = take_stock(product_id, quantity)
+    if not taken:
+        return False
+
+    insert = upsert_insert()
+    stmt = insert(StockReservation).values(
+        user_id=user_id,
+        product_id=product_id,
+        quantity=quantity,
+        expires_at=datetime.utcnow() + reservation_ttl()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StockReservation.user_id, StockReservation.product_id],
+        set_={
+            'quantity': StockReservation.quantity + stmt.excluded.quantity,
+            'expires_at': stmt.excluded.expires_at
+        }
+    )
+    db.session.execute(stmt)
+    return True
+
+def release_stock(user_id, product_id, quantity):
+    """Give back up to ``quantity`` of a user's reservation; returns the amount released"""
+    reserved = db.session.scalar(
+        select(StockReservation.quantity).where(
+            StockReservation.user_id == user_id, StockReservation.product_id == product_id
+        )
+    )
+    if not reserved:
+        return 0
+
+    released = min(quantity, reserved)
+    # Compare-and-set on the quantity read above so a concurrent expiry or
+    # release cannot hand the same units back twice
+    if released == reserved:
+        stmt = delete(StockReservation)
+    else:
+        stmt = update(StockReservation).values(quantity=reserved - released)
+    result = db.session.execute(
+        stmt.where(
+            StockReservation.user_id == user_id,
+            StockReservation.product_id == product_id,
+            StockReservation.quantity == reserved
+        ),
+        execution_options=_no_sync
+    )
+    if result.rowcount != 1:
+        return 0
+
+    if not release_flash_sale_stock(product_id, released):
+        return_stock({product_id: released})
+    return released
+
+def adjust_reservation(user_id, product_id, old_quantity, new_quantity):
+    """Reserve or release the difference when a cart line changes quantity"""
+    if new_quantity > old_quantity:
+        return reserve_stock(user_id, product_id, new_quantity - old_quantity)
+    if new_quantity < old_quantity:
+        release_stock(user_id, product_id, old_quantity - new_quantity)
+    return True
+
+def release_expired_reservations(batch_size=500, now=None):
+    """Return stock held by expired reservations, in small batches"""
+    now = now or datetime.utcnow()
+    released = 0
+    while True:
+        expired = select(StockReservation.id).where(
+            StockReservation.expires_at < now
+        ).limit(batch_size).scalar_subquery()
+
+        # DELETE ... RETURNING claims the rows, so a reservation extended in
+        # the meantime is neither deleted nor double-counted
+        rows = db.session.execute(
+            delete(StockReservation).where(
+                StockReservation.id.in_(expired), StockReservation.expires_at < now
+            ).returning(StockReservation.product_id, StockReservation.quantity),
+            execution_options=_no_sync
+        ).all()
+        if not rows:
+            break
+
+        quantities = {}
+        for product_id, quantity in rows:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        return_stock(quantities)
+        db.session.commit()
+        released += len(rows)
+    return released
@@ -0,0 +1,77 @@
+import pytest
+from src.models.product import Cart
+from conftest import auth, fill_cart, make_products, make_user
+
+def test_batch_rejects_add_and_update_of_same_product(client):
+    user_id = make_user()
+    product_id, = make_products(1)
+    fill_cart(user_id, [product_id], quantity=2)
+    item_id = Cart.query.filter_by(user_id=user_id).one().id
+
+    response = client.patch('/api/cart', json={'operations': [
+        {'op': 'add', 'product_id': product_id, 'quantity': 1},
+        {'op': 'update', 'item_id': item_id, 'quantity': 5},
+    ]}, headers=auth(user_id))
+
+    assert response.status_code == 400
+    assert response.json['product_ids'] == [product_id]
+    assert Cart.query.filter_by(user_id=user_id).one().quantity == 2
+
+def test_batch_rejects_two_changes_to_one_item(client):
+    user_id = make_user()
+    product_id, = make_products(1)
+    fill_cart(user_id, [product_id])
+    item_id = Cart.query.filter_by(user_id=user_id).one().id
+
+    response = client.patch('/api/cart', json={'operations': [
+        {'op': 'remove', 'item_id': item_id},
+        {'op': 'update', 'item_id': item_id, 'quantity': 3},
+    ]}, headers=auth(user_id))
+
+    assert response.status_code == 400
+    assert Cart.query.filter_by(user_id=user_id).one().quantity == 1
+
+@pytest.mark.parametrize('operation', [
+    {'op': 'add', 'product_id': True, 'quantity': True},
+    {'op': 'add', 'product_id': 1, 'quantity': True},
+    {'op': 'add', 'product_id': 1.0},
+    {'op': 'update', 'item_id': True, 'quantity': 2},
+    {'op': 'update', 'item_id': 1, 'quantity': False},
+    {'op': 'remove', 'item_id': True},
+])
+def test_batch_rejects_booleans_as_numbers(client, operation):
+    user_id = make_user()
+    make_products(1)
+
+    response = client.patch('/api/cart', json={'operations': [operation]}, headers=auth(user_id))
+
+    assert response.status_code == 400
+    assert Cart.query.filter_by(user_id=user_id).count() == 0
+
+def test_batch_applies_independent_operations(client):
+    user_id = make_user()
+    kept, dropped, added = make_products(3)
+    fill_cart(user_id, [kept, dropped])
+    items = {line.product_id: line.id for line in Cart.query.filter_by(user_id=user_id)}
+
+    response = client.patch('/api/cart', json={'operations': [
+        {'op': 'add', 'product_id': added, 'quantity': 2},
+        {'op': 'add', 'product_id': added},
+        {'op': 'update', 'item_id': items[kept], 'quantity': 4},
+        {'op': 'remove', 'item_id': items[dropped]},
+    ]}, headers=auth(user_id))
+
+    assert response.status_code == 200
+    assert response.json['applied'] == {'added': 1, 'updated': 1, 'removed': 1}
+    quantities = {line.product_id: line.quantity for line in Cart.query.filter_by(user_id=user_id)}
+    assert quantities == {kept: 4, added: 3}
+
+def test_anonymous_cart_requests_need_a_token(client):
+    owner = make_user()
+    product_id, = make_products(1)
+    fill_cart(owner, [product_id])
+
+    assert client.get('/api/cart').status_code == 401
+    assert client.post('/api/cart', json={'product_id': product_id}).status_code == 401
+    assert client.patch('/api/cart', json={'operations': [{'op': 'add', 'product_id': product_id}]}).status_code == 401
+    assert Cart.query.filter_by(user_id=owner).one().quantity == 1
@@ -0,0 +1,69 @@
+import pytest
+from src.models.user import db
+from src.models.product import Cart
+from src.services import cart_buffer
+from src.services.cart_buffer import CartWriteBuffer
+from conftest import fill_cart, make_products, make_user
+
+@pytest.fixture
+def cart_line(app):
+    user_id = make_user()
+    fill_cart(user_id, make_products(1))
+    return user_id, Cart.query.filter_by(user_id=user_id).one().id
+
+def test_flushing_batch_stays_visible_until_commit(app, monkeypatch, cart_line):
+    user_id, item_id = cart_line
+    buffer = CartWriteBuffer(app)
+    seen = []
+    write = cart_buffer.set_quantities
+
+    def observed(owner, quantities):
+        seen.append(buffer.pending_for(owner))
+        return write(owner, quantities)
+
+    monkeypatch.setattr(cart_buffer, 'set_quantities', observed)
+    buffer._pending[(user_id, item_id)] = 5
+
+    assert buffer.flush() == 1
+    assert seen == [{item_id: 5}]
+    assert buffer.pending_for(user_id) == {}
+    assert Cart.query.filter_by(id=item_id).one().quantity == 5
+
+def test_failed_flush_keeps_batch_pending(app, monkeypatch, cart_line):
+    user_id, item_id = cart_line
+    buffer = CartWriteBuffer(app)
+
+    def failing(owner, quantities):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(cart_buffer, 'set_quantities', failing)
+    buffer._pending[(user_id, item_id)] = 5
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.pending_for(user_id) == {item_id: 5}
+
+def test_flush_user_joins_the_callers_transaction(app, cart_line):
+    user_id, item_id = cart_line
+    buffer = CartWriteBuffer(app)
+    buffer._pending[(user_id, item_id)] = 5
+
+    assert buffer.flush_user(user_id) == 1
+    assert Cart.query.filter_by(id=item_id).one().quantity == 5
+    assert buffer.pending_for(user_id) == {item_id: 5}
+
+    db.session.commit()
+    assert buffer.pending_for(user_id) == {}
+    assert buffer._pending == {}
+
+def test_flush_user_rollback_returns_batch_to_buffer(app, cart_line):
+    user_id, item_id = cart_line
+    buffer = CartWriteBuffer(app)
+    buffer._pending[(user_id, item_id)] = 5
+
+    buffer.flush_user(user_id)
+    db.session.rollback()
+
+    assert Cart.query.filter_by(id=item_id).one().quantity == 1
+    assert buffer._pending == {(user_id, item_id): 5}
+    assert buffer._in_flight == {}
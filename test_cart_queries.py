@@ -0,0 +1,27 @@
+import pytest
+from conftest import auth, fill_cart, make_products, make_user
+
+@pytest.mark.parametrize('items', [1, 5, 40])
+def test_get_cart_issues_one_statement(client, statements, items):
+    user_id = make_user()
+    fill_cart(user_id, make_products(items), quantity=2)
+    headers = auth(user_id)
+    client.get('/api/cart', headers=headers)  # warm up caches that may query once
+
+    statements.clear()
+    response = client.get('/api/cart', headers=headers)
+
+    assert response.status_code == 200
+    assert response.json['count'] == items
+    assert response.json['total_kobo'] == items * 2 * 150000
+    assert len(statements) == 1, statements
+
+def test_get_cart_of_empty_cart_issues_one_statement(client, statements):
+    headers = auth(make_user())
+    client.get('/api/cart', headers=headers)
+
+    statements.clear()
+    response = client.get('/api/cart', headers=headers)
+
+    assert response.json['count'] == 0
+    assert len(statements) == 1, statements
@@ -0,0 +1,53 @@
+import threading
+import pytest
+from src.models.product import Cart
+from src.services import cart_ops
+from conftest import auth, make_products, make_user
+
+def test_concurrent_adds_merge_into_one_row(app, client):
+    user_id = make_user()
+    product_id, = make_products(1)
+    headers = auth(user_id)
+    threads, adds, failures = 8, 10, []
+
+    def shopper():
+        http = app.test_client()
+        for _ in range(adds):
+            response = http.post('/api/cart', json={'product_id': product_id, 'quantity': 1}, headers=headers)
+            if response.status_code != 200:
+                failures.append(response.json)
+
+    workers = [threading.Thread(target=shopper) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert failures == []
+    rows = Cart.query.filter_by(user_id=user_id).all()
+    assert len(rows) == 1
+    assert rows[0].quantity == threads * adds
+
+@pytest.mark.parametrize('product_id', ['abc', '', True, -3, 1.5, None, '１'])
+def test_add_rejects_invalid_product_id(client, product_id):
+    response = client.post('/api/cart', json={'product_id': product_id}, headers=auth(make_user()))
+    assert response.status_code == 400
+
+def test_add_accepts_numeric_string_id(client):
+    user_id = make_user()
+    product_id, = make_products(1)
+    response = client.post('/api/cart', json={'product_id': str(product_id)}, headers=auth(user_id))
+    assert response.status_code == 200
+    assert Cart.query.filter_by(user_id=user_id, product_id=product_id).one().quantity == 1
+
+def test_add_without_upsert_support_inserts_then_increments(client, monkeypatch):
+    monkeypatch.setattr(cart_ops, '_dialect_inserts', {})
+    user_id = make_user()
+    product_id, = make_products(1)
+    headers = auth(user_id)
+
+    for _ in range(2):
+        response = client.post('/api/cart', json={'product_id': product_id, 'quantity': 2}, headers=headers)
+        assert response.status_code == 200
+
+    assert Cart.query.filter_by(user_id=user_id).one().quantity == 4
@@ -0,0 +1,21 @@
+from sqlalchemy import func, select
+from src.models.user import db
+from src.models.product import Category
+from src.models.product_schema import Product
+from src.services.catalog_generator import generate_catalog
+
+def test_generator_reuses_categories_by_name(app):
+    db.session.add(Category(name='Electronics', description='Seeded'))
+    db.session.commit()
+    seeded_id = Category.query.one().id
+
+    counts = generate_catalog(categories=12, products=200, users=3, carts=2)
+    again = generate_catalog(categories=12, products=10, users=0, carts=0, seed=2)
+
+    assert counts['categories'] == 11
+    assert again['categories'] == 0
+    assert Category.query.count() == 12
+    assert Category.query.filter_by(name='Electronics').count() == 1
+    used = set(db.session.scalars(select(Product.category_id).distinct()))
+    assert used <= {category.id for category in Category.query}
+    assert db.session.scalar(select(func.count()).where(Product.category_id == seeded_id)) > 0
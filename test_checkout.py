@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy import update
+from src.models.user import db
+from src.models.product import Cart
+from src.models.product_schema import Product
+from src.models.order import Order, OrderItem
+from src.models.outbox_message import OutboxMessage
+from src.models.reservation import StockReservation
+from conftest import auth, fill_cart, make_products, make_user
+
+def stock_levels():
+    return {product.id: product.stock_quantity for product in Product.query.order_by(Product.id)}
+
+@pytest.mark.parametrize('guest_carts', [False, True])
+def test_checkout_requires_a_token(app, client, guest_carts):
+    app.config['GUEST_CARTS'] = guest_carts
+    owner = make_user()
+    fill_cart(owner, make_products(2))
+
+    response = client.post('/api/checkout')
+
+    assert response.status_code == 401
+    assert Cart.query.filter_by(user_id=owner).count() == 2
+
+def test_checkout_orders_the_callers_cart(client):
+    owner, other = make_user('owner'), make_user('other')
+    first, second = make_products(2)
+    fill_cart(owner, [first], quantity=2)
+    fill_cart(other, [second])
+
+    response = client.post('/api/checkout', headers=auth(owner))
+
+    assert response.status_code == 201
+    assert response.json['order']['user_id'] == owner
+    assert Cart.query.filter_by(user_id=owner).count() == 0
+    assert Cart.query.filter_by(user_id=other).count() == 1
+
+def test_checkout_takes_stock_and_records_the_order_once(client, statements):
+    user_id = make_user()
+    first, second = make_products(2, stock_quantity=5, price_kobo=20000)
+    fill_cart(user_id, [first], quantity=2)
+    fill_cart(user_id, [second], quantity=3)
+
+    statements.clear()
+    response = client.post('/api/checkout', headers=auth(user_id))
+
+    assert response.status_code == 201
+    assert stock_levels() == {first: 3, second: 2}
+    assert len([sql for sql in statements if sql.startswith('UPDATE products')]) == 1
+    order = db.session.get(Order, response.json['order']['id'])
+    assert order.total_kobo == 5 * 20000
+    assert {(item.product_id, item.quantity) for item in order.items} == {(first, 2), (second, 3)}
+    message, = OutboxMessage.query.all()
+    assert message.topic == 'order.placed'
+    assert message.payload == {'order_id': order.id, 'user_id': user_id, 'total_kobo': 100000, 'item_count': 2}
+
+def test_checkout_short_on_stock_changes_nothing(client):
+    user_id = make_user()
+    plenty, scarce = make_products(2, stock_quantity=2)
+    fill_cart(user_id, [plenty], quantity=1)
+    fill_cart(user_id, [scarce], quantity=3)
+
+    response = client.post('/api/checkout', headers=auth(user_id))
+
+    assert response.status_code == 409
+    assert response.json['product_ids'] == [scarce]
+    assert stock_levels() == {plenty: 2, scarce: 2}
+    assert Order.query.count() == 0
+    assert OrderItem.query.count() == 0
+    assert OutboxMessage.query.count() == 0
+    assert Cart.query.filter_by(user_id=user_id).count() == 2
+
+def test_checkout_only_takes_what_is_not_reserved(app, client):
+    app.config['STOCK_RESERVATIONS'] = True
+    user_id = make_user()
+    product_id, = make_products(1, stock_quantity=5)
+    headers = auth(user_id)
+    client.post('/api/cart', json={'product_id': product_id, 'quantity': 2}, headers=headers)
+    assert stock_levels() == {product_id: 3}
+    db.session.execute(update(Cart).values(quantity=4))
+    db.session.commit()
+
+    response = client.post('/api/checkout', headers=headers)
+
+    assert response.status_code == 201
+    assert stock_levels() == {product_id: 1}
+    assert StockReservation.query.count() == 0
+
+def test_archived_products_stay_out_of_the_cart_and_the_order(client):
+    user_id = make_user()
+    kept, archived = make_products(2, stock_quantity=5, price_kobo=20000)
+    fill_cart(user_id, [kept, archived], quantity=2)
+    db.session.execute(update(Product).where(Product.id == archived).values(is_active=False))
+    db.session.commit()
+    headers = auth(user_id)
+
+    cart = client.get('/api/cart', headers=headers).json
+    assert [item['product_id'] for item in cart['cart_items']] == [kept]
+    assert (cart['total_kobo'], cart['count']) == (40000, 1)
+
+    response = client.post('/api/checkout', headers=headers)
+
+    assert response.status_code == 201
+    order = db.session.get(Order, response.json['order']['id'])
+    assert [(item.product_id, item.quantity) for item in order.items] == [(kept, 2)]
+    assert order.item_count == 1
+    assert stock_levels() == {kept: 3, archived: 5}
+    assert [line.product_id for line in Cart.query.filter_by(user_id=user_id)] == [archived]
+
+def test_checkout_of_only_archived_products_is_an_empty_cart(client):
+    user_id = make_user()
+    product_id, = make_products(1)
+    fill_cart(user_id, [product_id])
+    db.session.execute(update(Product).values(is_active=False))
+    db.session.commit()
+
+    response = client.post('/api/checkout', headers=auth(user_id))
+
+    assert response.status_code == 400
+    assert stock_levels() == {product_id: 100}
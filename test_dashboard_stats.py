@@ -0,0 +1,49 @@
+from sqlalchemy import update
+from src.models.user import db
+from src.models.product_schema import Product
+from src.services.dashboard_stats import read_stats, refresh_stats
+from conftest import fill_cart, make_products, make_user
+
+def test_refresh_computes_rollups_before_writing(app, statements):
+    first, second, archived = make_products(3, stock_quantity=10)
+    db.session.execute(update(Product).where(Product.id == archived).values(is_active=False))
+    db.session.execute(update(Product).where(Product.id == first).values(is_featured=True))
+    db.session.commit()
+    fill_cart(make_user(), [first, second], quantity=2)
+
+    statements.clear()
+    refresh_stats()
+    executed = [sql.upper() for sql in statements]
+    stats = read_stats()
+
+    writes = [n for n, sql in enumerate(executed) if sql.lstrip().startswith(('INSERT', 'DELETE'))]
+    reads = [n for n, sql in enumerate(executed) if sql.lstrip().startswith('SELECT')]
+    assert writes and reads and max(reads) < min(writes)
+    assert not any('SELECT' in executed[n] for n in writes)
+    assert stats['products'] == {
+        'total': 3, 'active': 2, 'featured': 1, 'stock_units': 20, 'inventory_value_kobo': 20 * 150000
+    }
+    assert stats['carts'] == {'carts': 1, 'lines': 2, 'units': 4, 'value_kobo': 4 * 150000}
+
+def test_refresh_replaces_previous_rollups(app):
+    make_products(2)
+    refresh_stats()
+    db.session.execute(update(Product).values(category_id=3))
+    db.session.commit()
+
+    refresh_stats()
+
+    assert [row['category_id'] for row in read_stats()['categories']] == [3]
+
+def test_requests_never_refresh_and_the_command_does(app, client):
+    app.config['STATS_REFRESHER'] = True
+    make_products(1)
+
+    client.get('/api/products')
+    assert read_stats()['refreshed_at'] is None
+
+    result = app.test_cli_runner().invoke(args=['product', 'refresh-stats'])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout == 'Dashboard stats refreshed\n'
+    assert read_stats()['products']['total'] == 1
@@ -0,0 +1,31 @@
+import json
+from sqlalchemy import update
+from src.models.user import db
+from src.models.product_schema import Product
+from src.services import exports
+from src.services.exports import export_rows
+from conftest import make_products
+
+def test_export_pages_by_id_without_holding_a_transaction(app, monkeypatch):
+    monkeypatch.setattr(exports, 'FETCH_SIZE', 2)
+    product_ids = make_products(5)
+    chunks = export_rows('products', 'ndjson')
+
+    first = next(chunks)
+    # A writer gets in between pages
+    db.session.execute(update(Product).where(Product.id == product_ids[-1]).values(stock_quantity=7))
+    db.session.commit()
+    rows = [json.loads(line) for chunk in [first, *chunks] for line in chunk.decode().splitlines()]
+
+    assert [row['id'] for row in rows] == product_ids
+    assert rows[-1]['stock_quantity'] == 7
+
+def test_export_applies_filters_on_every_page(app, monkeypatch):
+    monkeypatch.setattr(exports, 'FETCH_SIZE', 2)
+    product_ids = make_products(6)
+    db.session.execute(update(Product).where(Product.id.in_(product_ids[::2])).values(is_featured=True))
+    db.session.commit()
+
+    body = b''.join(export_rows('products', 'csv', [Product.is_featured == True])).decode()
+
+    assert [int(line.split(',')[0]) for line in body.splitlines()[1:]] == product_ids[::2]
@@ -0,0 +1,135 @@
+import pytest
+from sqlalchemy import update
+from src.models.user import db
+from src.models.product_schema import Product
+from src.models.sale import FlashSale, FlashSaleHold
+from src.models.reservation import StockReservation
+from src.services import flash_sale
+from src.services.flash_sale import FlashSaleInventory, init_flash_sales
+from conftest import auth, make_products, make_user
+
+@pytest.fixture
+def sale(app, tmp_path):
+    """A product on flash sale in blocks of 10 and a started inventory"""
+    product_id, = make_products(1, stock_quantity=100)
+    db.session.add(FlashSale(product_id=product_id, block_size=10))
+    db.session.commit()
+    inventory = FlashSaleInventory(app, journal_dir=str(tmp_path / 'journal'), interval=3600)
+    inventory.start()
+    yield inventory, product_id
+    inventory.close()
+
+def crash(inventory):
+    """Stop a worker without handing anything back, as if it had died"""
+    inventory._stopped.set()
+    inventory._thread.join()
+    for shard in inventory._shards:
+        shard.journal.close()
+
+def stock(product_id):
+    db.session.expire_all()
+    return db.session.get(Product, product_id).stock_quantity
+
+def test_refill_uses_the_requests_own_transaction(sale):
+    inventory, product_id = sale
+    other = make_products(1)[-1]
+    # The request already holds SQLite's write lock when the counter runs dry
+    db.session.execute(update(Product).where(Product.id == other).values(stock_quantity=Product.stock_quantity - 1))
+
+    assert inventory.take(product_id, 3, db.session)
+    db.session.commit()
+
+    assert stock(product_id) == 90
+    assert inventory._shard(product_id).available[product_id] == 7
+
+def test_rolled_back_refill_returns_nothing_to_the_counter(sale):
+    inventory, product_id = sale
+
+    assert inventory.take(product_id, 3, db.session)
+    db.session.rollback()
+
+    assert stock(product_id) == 100
+    assert inventory._shard(product_id).available[product_id] == 0
+    assert inventory._shard(product_id).sold[product_id] == 0
+
+def test_recovery_after_a_surplus_return(app, sale, tmp_path):
+    inventory, product_id = sale
+    assert inventory.take(product_id, 1, db.session)
+    db.session.commit()
+    # Units taken by another worker come back here, pushing the counter past
+    # the two blocks a running sale keeps, so the next pass returns the surplus
+    inventory.give_back(product_id, 15)
+    inventory.reconcile()
+    assert stock(product_id) == 94
+    assert db.session.get(FlashSaleHold, (inventory.journal_id, product_id), populate_existing=True).held == 6
+    crash(inventory)
+
+    survivor = FlashSaleInventory(app, journal_dir=str(tmp_path / 'journal'))
+    survivor.recover()
+
+    # The dead worker's counter held 20 units; exactly those go back
+    assert stock(product_id) == 114
+    assert FlashSaleHold.query.count() == 0
+
+def test_compacted_journal_recovers_the_same_stock(app, sale, tmp_path):
+    inventory, product_id = sale
+    inventory.compact_bytes = 64
+    for _ in range(20):
+        assert inventory.take(product_id, 1, db.session)
+        db.session.commit()
+        inventory.give_back(product_id, 1)
+    assert inventory.take(product_id, 2, db.session)
+    db.session.commit()
+    shard = inventory._shard(product_id)
+    size = shard.journal.tell()
+
+    inventory.reconcile()
+
+    assert shard.journal.tell() < size
+    with open(shard.journal_path) as journal:
+        assert journal.read() == f'S {product_id} 2\n'
+    crash(inventory)
+
+    FlashSaleInventory(app, journal_dir=str(tmp_path / 'journal')).recover()
+    assert stock(product_id) == 98
+
+def test_shards_keep_separate_journals_and_recover_together(app, sale, tmp_path):
+    inventory, product_id = sale
+    other = make_products(1, stock_quantity=100)[-1]
+    db.session.add(FlashSale(product_id=other, block_size=10))
+    db.session.commit()
+    inventory.reconcile()
+    assert inventory._shard(product_id) is not inventory._shard(other)
+
+    assert inventory.take(product_id, 3, db.session)
+    assert inventory.take(other, 4, db.session)
+    db.session.commit()
+    for sold, product in ((3, product_id), (4, other)):
+        with open(inventory._shard(product).journal_path) as journal:
+            assert journal.read() == f'S {product} {sold}\n'
+    crash(inventory)
+
+    FlashSaleInventory(app, journal_dir=str(tmp_path / 'journal')).recover()
+
+    assert (stock(product_id), stock(other)) == (97, 96)
+    assert FlashSaleHold.query.count() == 0
+
+def test_flash_sales_stay_off_without_fcntl(app, monkeypatch):
+    monkeypatch.setattr(flash_sale, 'fcntl', None)
+    app.config['FLASH_SALES'] = True
+
+    init_flash_sales(app)
+
+    assert 'flash_sale_inventory' not in app.extensions
+
+def test_running_flash_sale_reserves_cart_stock(app, client, sale):
+    inventory, product_id = sale
+    app.extensions['flash_sale_inventory'] = inventory
+    user_id = make_user()
+
+    response = client.post('/api/cart', json={'product_id': product_id, 'quantity': 2}, headers=auth(user_id))
+
+    assert response.status_code == 200
+    assert StockReservation.query.filter_by(user_id=user_id, product_id=product_id).one().quantity == 2
+    assert stock(product_id) == 90
+    assert inventory._shard(product_id).available[product_id] == 8
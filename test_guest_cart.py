@@ -0,0 +1,21 @@
+from flask import Response
+from src.models.user import db
+from src.models.product import Cart
+from src.models.product_schema import Product
+from src.services.guest_cart import merge_guest_cart
+from conftest import make_products, make_user
+
+def test_merge_reserves_stock_like_add_to_cart(app, client):
+    app.config.update(GUEST_CARTS=True, STOCK_RESERVATIONS=True)
+    user_id = make_user()
+    plenty, scarce = make_products(2, stock_quantity=3)
+    client.post('/api/cart', json={'product_id': plenty, 'quantity': 2})
+    client.post('/api/cart', json={'product_id': scarce, 'quantity': 5})
+    cookie = client.get_cookie('mauma_cart').value
+
+    with app.test_request_context(headers={'Cookie': f'mauma_cart={cookie}'}):
+        merge_guest_cart(user_id, Response())
+        db.session.commit()
+
+    assert {line.product_id: line.quantity for line in Cart.query.filter_by(user_id=user_id)} == {plenty: 2}
+    assert {product.id: product.stock_quantity for product in Product.query} == {plenty: 1, scarce: 3}
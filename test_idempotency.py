@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from src.models.user import db
+from src.models.idempotency_key import IdempotencyKey
+from src.services.idempotency import _request_hash
+from conftest import auth, make_products, make_user
+
+def test_guest_replay_keeps_the_cart_cookie(app, client):
+    app.config['GUEST_CARTS'] = True
+    product_id, = make_products(1)
+    request = {'json': {'product_id': product_id}, 'headers': {'Idempotency-Key': 'guest-add'}}
+
+    first = client.post('/api/cart', **request)
+    client.delete_cookie('mauma_cart')
+    replay = client.post('/api/cart', **request)
+
+    assert first.status_code == replay.status_code == 200
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.headers.getlist('Set-Cookie') == first.headers.getlist('Set-Cookie')
+    assert replay.json == first.json
+
+def test_key_reused_with_another_guest_cart_is_rejected(app, client):
+    app.config['GUEST_CARTS'] = True
+    product_id, = make_products(1)
+    request = {'json': {'product_id': product_id}, 'headers': {'Idempotency-Key': 'guest-add'}}
+
+    assert client.post('/api/cart', **request).status_code == 200
+    client.set_cookie('mauma_cart', 'another-cart')
+
+    assert client.post('/api/cart', **request).status_code == 422
+
+def test_abandoned_claim_expires_after_its_lease(app, client):
+    user_id = make_user()
+    product_id, = make_products(1)
+    headers = {**auth(user_id), 'Idempotency-Key': 'crashed'}
+    body = {'product_id': product_id}
+    with app.test_request_context('/api/cart', method='POST', json=body, headers=headers):
+        request_hash = _request_hash()
+    db.session.add(IdempotencyKey(
+        scope='product.add_to_cart', key='crashed', request_hash=request_hash,
+        expires_at=datetime.utcnow() - timedelta(seconds=1)
+    ))
+    db.session.commit()
+
+    response = client.post('/api/cart', json=body, headers=headers)
+
+    assert response.status_code == 200
+    assert 'Idempotent-Replayed' not in response.headers
+    record = db.session.get(IdempotencyKey, ('product.add_to_cart', 'crashed'), populate_existing=True)
+    assert record.response_status == 200
+    assert record.expires_at > datetime.utcnow() + timedelta(hours=23)
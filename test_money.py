@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy import insert, select
+from src.models.user import db
+from src.models.product_schema import Product
+from src.services.money import Money, migrate_money_columns
+
+@pytest.mark.parametrize('price', [0.285, 1.005, 1234.565, 99.99, 150000])
+def test_backfill_rounds_like_the_flush_hook(app, price):
+    db.session.execute(insert(Product.__table__), [
+        {'name': 'Legacy', 'price': price, 'original_price': price * 2, 'stock_quantity': 1, 'is_active': True}
+    ])
+    db.session.commit()
+
+    assert migrate_money_columns(db.session, Product.__table__) == 1
+    kobo, original_kobo = db.session.execute(select(Product.price_kobo, Product.original_price_kobo)).one()
+    assert kobo == Money.from_naira(price).kobo
+    assert original_kobo == Money.from_naira(price * 2).kobo
+    assert migrate_money_columns(db.session, Product.__table__) == 0
@@ -0,0 +1,42 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from src.models.user import db, User
+from src.services.passwords import PasswordHasher, PasswordHasherBusy
+from conftest import make_user
+
+@pytest.fixture
+def hasher(app):
+    """A cheap work factor so the pool answers quickly"""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+    app.extensions['password_hasher'] = hasher
+    yield hasher
+    hasher.close()
+
+def test_verify_treats_unparseable_hashes_as_a_mismatch(hasher):
+    assert hasher.verify('$2b$12$R9h/cIPz0gi.URNNX3kh2OPST9/PgBkqquzi.Ss7KIUgO2t0jWMUW', 'secret') is False
+    assert hasher.verify(generate_password_hash('secret', 'pbkdf2:sha256:1000'), 'secret') is True
+
+def test_slow_job_raises_busy(hasher):
+    hasher.timeout = 0.001
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('secret' * 100)
+
+def test_login_with_a_legacy_hash_is_a_401(client, hasher):
+    user = db.session.get(User, make_user())
+    user.password_hash = 'bcrypt$2b$12$legacy'
+    db.session.commit()
+
+    response = client.post('/api/users/login', json={'email': user.email, 'password': 'secret'})
+
+    assert response.status_code == 401
+
+def test_login_that_times_out_is_a_503(client, hasher):
+    user = db.session.get(User, make_user())
+    user.password_hash = generate_password_hash('secret', 'pbkdf2:sha256:1000')
+    db.session.commit()
+    hasher.timeout = 0.001
+
+    response = client.post('/api/users/login', json={'email': user.email, 'password': 'secret'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
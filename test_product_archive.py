@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from src.models.user import db
+from src.models.product_schema import Product
+from src.models.archive import ProductArchive
+from src.services.product_archive import archive_products, purge_archived_products
+from src.services.product_bulk import bulk_update_products
+from src.services.product_import import import_products
+from conftest import make_products
+
+LATER = datetime.utcnow() + timedelta(days=365)
+
+def test_purge_keeps_products_reactivated_by_bulk_update(app):
+    kept, purged = make_products(2)
+    archive_products([Product.id.in_([kept, purged])])
+    db.session.commit()
+
+    bulk_update_products([Product.id == kept], {'is_active': True})
+    db.session.commit()
+
+    assert purge_archived_products(now=LATER) == 1
+    assert [product.id for product in Product.query] == [kept]
+    assert ProductArchive.query.count() == 0
+
+def test_purge_skips_active_products_with_a_stale_archive_row(app):
+    product_id, = make_products(1)
+    archive_products([Product.id == product_id])
+    db.session.execute(update(Product).values(is_active=True))
+    db.session.commit()
+
+    assert purge_archived_products(now=LATER) == 0
+    assert db.session.get(Product, product_id) is not None
+
+def test_archiving_again_restarts_the_clock(app):
+    product_id, = make_products(1)
+    archive_products([Product.id == product_id], now=datetime.utcnow() - timedelta(days=200))
+    db.session.execute(update(Product).values(is_active=True))
+    db.session.commit()
+
+    archive_products([Product.id == product_id])
+    db.session.commit()
+
+    assert purge_archived_products() == 0
+
+def test_purge_removes_products_deactivated_by_bulk_update(app):
+    deactivated, kept = make_products(2)
+
+    bulk_update_products([Product.id == deactivated], {'is_active': False})
+    db.session.commit()
+
+    assert purge_archived_products(now=LATER) == 1
+    assert [product.id for product in Product.query] == [kept]
+
+def test_purge_removes_products_deactivated_by_import(app):
+    existing, kept = make_products(2)
+    name = db.session.get(Product, existing).name
+
+    report = import_products(enumerate([
+        {'name': name, 'is_active': 'false'},
+        {'name': 'Retired kettle', 'price': '4500', 'is_active': 'false'},
+    ], start=2))
+
+    assert (report['created'], report['updated']) == (1, 1)
+    assert ProductArchive.query.count() == 2
+    assert purge_archived_products(now=LATER) == 2
+    assert [product.id for product in Product.query] == [kept]
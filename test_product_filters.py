@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import update
+from src.models.user import db, User
+from src.models.product_schema import Product
+from conftest import make_products, make_user
+
+@pytest.fixture
+def admin(app):
+    user = db.session.get(User, make_user('admin'))
+    user.is_admin = True
+    db.session.commit()
+    return {'X-Admin-ID': str(user.id)}
+
+def featured(*product_ids):
+    db.session.execute(update(Product).where(Product.id.in_(product_ids)).values(is_featured=True))
+    db.session.commit()
+
+@pytest.mark.parametrize('value, count', [('true', 1), ('1', 1), ('false', 2), ('0', 2), ('maybe', 3)])
+def test_products_featured_filter(client, value, count):
+    first, _, _ = make_products(3)
+    featured(first)
+
+    response = client.get(f'/api/products?featured={value}')
+
+    assert response.status_code == 200
+    assert len(response.json['products']) == count
+
+@pytest.mark.parametrize('bad_filter', [{'featured': 'maybe'}, {'brand': ['Tecno', 'Infinix']}, {'category_id': True}])
+def test_bulk_update_rejects_malformed_filters(client, admin, bad_filter):
+    make_products(2)
+
+    response = client.post('/api/admin/products/bulk-update', headers=admin,
+                           json={'filter': bad_filter, 'set': {'stock_quantity': 0}})
+
+    assert response.status_code == 400
+    assert Product.query.filter(Product.stock_quantity == 0).count() == 0
+
+def test_bulk_update_skips_archived_products_unless_asked(client, admin):
+    active, archived = make_products(2)
+    db.session.execute(update(Product).where(Product.id == archived).values(is_active=False))
+    db.session.commit()
+    request = {'filter': {'featured': 'false'}, 'set': {'stock_quantity': 5}}
+
+    response = client.post('/api/admin/products/bulk-update', headers=admin, json=request)
+    assert response.json['updated'] == 1
+
+    response = client.post('/api/admin/products/bulk-update', headers=admin, json={**request, 'include_archived': True})
+    assert response.json['updated'] == 2
+
+@pytest.mark.parametrize('percent', [float('inf'), float('-inf'), float('nan'), -101, 1e308])
+def test_bulk_update_rejects_out_of_range_percentages(client, admin, percent):
+    make_products(1)
+
+    response = client.post('/api/admin/products/bulk-update', headers=admin,
+                           json={'all': True, 'set': {'price_percent': percent}})
+
+    assert response.status_code == 400
+    assert 'price_percent' in response.json['error']
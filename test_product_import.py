@@ -0,0 +1,12 @@
+from src.models.product_schema import Product
+
+def test_import_products_command_reports_through_click(app, tmp_path):
+    path = tmp_path / 'products.csv'
+    path.write_text('name,price,stock_quantity\nKettle,4500.50,12\nToaster,,3\n')
+
+    result = app.test_cli_runner().invoke(args=['product', 'import-products', str(path)])
+
+    assert result.exit_code == 0, result.output
+    assert 'Done: 1 created, 0 updated, 1 failed' in result.stdout
+    assert 'row 3: price is required for a new product' in result.stderr
+    assert Product.query.one().price_kobo == 450050
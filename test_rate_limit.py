@@ -0,0 +1,18 @@
+import pytest
+from src.services.rate_limit import init_rate_limiter
+
+def signup(client, n, ip):
+    return client.post('/api/users', json={'username': f'user{n}', 'email': f'user{n}@example.com'},
+                       headers={'X-Forwarded-For': ip})
+
+@pytest.mark.parametrize('hops, other_client_status', [(0, 429), (1, 201)])
+def test_per_ip_limit_behind_a_proxy(app, client, hops, other_client_status):
+    app.extensions.pop('rate_limiter')
+    app.config.update(RATE_LIMIT_ENABLED=True, PROXY_FIX_X_FOR=hops)
+    init_rate_limiter(app)
+
+    for n in range(10):
+        assert signup(client, n, '203.0.113.7').status_code == 201
+    assert signup(client, 10, '203.0.113.7').status_code == 429
+
+    assert signup(client, 11, '198.51.100.4').status_code == other_client_status
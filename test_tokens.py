@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from src.models.user import db
+from src.models.revoked_token import RevokedToken
+from src.services import tokens
+from src.services.tokens import issue_token, load_revocations, verify_token
+
+def test_cached_claims_are_copied(app):
+    token = issue_token(7)
+    verify_token(token)['user_id'] = 8
+
+    assert verify_token(token)['user_id'] == 7
+
+def test_reload_keeps_revocations_not_yet_stored(app):
+    digest = b'\x01' * 32
+    tokens._remember_revocations({digest: (datetime.utcnow() + timedelta(hours=1)).timestamp()})
+
+    load_revocations()
+
+    assert digest in tokens._revoked
+
+def test_reload_leaves_expired_rows_to_the_purge(app):
+    db.session.add_all([
+        RevokedToken(token_digest=b'\x02' * 32, expires_at=datetime.utcnow() - timedelta(minutes=1)),
+        RevokedToken(token_digest=b'\x03' * 32, expires_at=datetime.utcnow() + timedelta(hours=1)),
+    ])
+    db.session.commit()
+
+    load_revocations()
+    assert RevokedToken.query.count() == 2
+    assert b'\x02' * 32 not in tokens._revoked
+    assert b'\x03' * 32 in tokens._revoked
+
+    result = app.test_cli_runner().invoke(args=['user', 'purge-revoked-tokens'])
+    assert 'Purged 1 expired token revocations' in result.output
+    assert [row.token_digest for row in RevokedToken.query] == [b'\x03' * 32]
@@ -0,0 +1,31 @@
+import json
+from sqlalchemy import update
+from src.models.user import db, User
+from src.services import user_listing
+from conftest import make_user
+
+def test_ndjson_pages_by_id_without_holding_a_transaction(app, monkeypatch):
+    monkeypatch.setattr(user_listing, 'STREAM_PAGE_SIZE', 2)
+    user_ids = [make_user(f'user{n}') for n in range(5)]
+
+    with app.test_request_context('/api/users?format=ndjson'):
+        chunks = user_listing._ndjson(User.query.order_by(User.id))
+        first = next(chunks)
+        # A writer on another connection commits between pages instead of
+        # waiting out the busy timeout
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA busy_timeout = 100')
+            connection.execute(update(User).where(User.id == user_ids[-1]).values(username='renamed'))
+            connection.commit()
+        rows = [json.loads(line) for chunk in [first, *chunks] for line in chunk.splitlines()]
+
+    assert [row['id'] for row in rows] == user_ids
+    assert rows[-1]['username'] == 'renamed'
+
+def test_ndjson_listing_applies_filters(client):
+    make_user('alice')
+    make_user('bob')
+
+    response = client.get('/api/users?format=ndjson&email_prefix=BOB')
+
+    assert [json.loads(line)['username'] for line in response.get_data(as_text=True).splitlines()] == ['bob']
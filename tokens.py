@@ -0,0 +1,203 @@
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import current_app, request
+from sqlalchemy import delete, event, select
+from src.models.user import db, User
+from src.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+SECRET_KEY = os.getenv("SECRET_KEY", "mauma_secret_key")
+
+# Verified claims are kept until the token's own exp, so a cached token can
+# never outlive what jwt.decode would have accepted
+CLAIMS_CACHE_SIZE = 10000
+ADMIN_ROLE_CACHE_SIZE = 10000
+# Bounds how long another worker may keep trusting a demoted admin
+ADMIN_ROLE_TTL = 60.0
+# How often each worker reloads the revocation list from the database
+REVOCATION_REFRESH = 5.0
+
+_claims = OrderedDict()
+_claims_lock = threading.Lock()
+_admin_roles = OrderedDict()
+_admin_roles_lock = threading.Lock()
+
+# digest -> exp (epoch seconds). Writers build a new dict under the lock and
+# swap it in, so a lookup is one dict probe without a lock
+_revoked = {}
+_revoked_lock = threading.Lock()
+_revocation_sync = None
+_revocation_sync_lock = threading.Lock()
+
+def bearer_token():
+    """Return the raw token from an 'Authorization: Bearer' header, or None"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split(" ")[1]
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).digest()
+
+def verify_token(token):
+    """Return the claims of a valid token, raising jwt.InvalidTokenError otherwise.
+
+    Repeat presentations of a token are served from an LRU of verified
+    claims keyed by the token's digest instead of re-checking the signature.
+    Callers get their own copy of the claims.
+    """
+    _start_revocation_sync()
+    digest = _digest(token)
+    if digest in _revoked:
+        raise jwt.InvalidTokenError('Token has been revoked')
+
+    now = time.time()
+    with _claims_lock:
+        payload = _claims.get(digest)
+        if payload is not None:
+            if payload['exp'] > now:
+                _claims.move_to_end(digest)
+                return dict(payload)
+            del _claims[digest]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+    if isinstance(payload.get('exp'), (int, float)):
+        with _claims_lock:
+            _claims[digest] = payload
+            if len(_claims) > CLAIMS_CACHE_SIZE:
+                _claims.popitem(last=False)
+    return dict(payload)
+
+def token_user_id():
+    """Return the user id of a valid bearer token, or None for anonymous requests"""
+    token = bearer_token()
+    if not token:
+        return None
+    try:
+        payload = verify_token(token)
+    except jwt.InvalidTokenError:
+        return None
+    return payload.get('user_id')
+
+def issue_token(user_id, is_admin=False, lifetime=datetime.timedelta(hours=1)):
+    """Sign a bearer token for a user"""
+    return jwt.encode({
+        'user_id': user_id,
+        'is_admin': is_admin,
+        'exp': datetime.datetime.utcnow() + lifetime
+    }, SECRET_KEY, algorithm='HS256')
+
+def revoke_token(token):
+    """Refuse a token from now on; takes effect at once here and within REVOCATION_REFRESH elsewhere.
+
+    The caller commits. Returns False for a token that is already invalid.
+    """
+    try:
+        payload = verify_token(token)
+    except jwt.InvalidTokenError:
+        return False
+    digest = _digest(token)
+    expires_at = datetime.datetime.utcfromtimestamp(payload['exp'])
+    db.session.merge(RevokedToken(token_digest=digest, expires_at=expires_at))
+    _remember_revocations({digest: payload['exp']})
+    with _claims_lock:
+        _claims.pop(digest, None)
+    return True
+
+def _remember_revocations(revocations):
+    """Merge {digest: exp} into the local list, dropping entries whose tokens have expired"""
+    global _revoked
+    now = time.time()
+    with _revoked_lock:
+        merged = {digest: exp for digest, exp in _revoked.items() if exp > now}
+        merged.update(revocations)
+        _revoked = merged
+
+def load_revocations():
+    """Merge in the unexpired revocations recorded by every worker.
+
+    Read-only: expired rows are deleted by ``purge_revoked_tokens``, run from
+    one scheduled job rather than from every worker.
+    """
+    now = datetime.datetime.utcnow()
+    rows = db.session.execute(
+        select(RevokedToken.token_digest, RevokedToken.expires_at).where(RevokedToken.expires_at >= now)
+    ).all()
+    db.session.rollback()
+    _remember_revocations({
+        digest: expires_at.replace(tzinfo=datetime.timezone.utc).timestamp() for digest, expires_at in rows
+    })
+
+def purge_revoked_tokens(batch_size=1000):
+    """Delete revocations of tokens that have expired anyway, in small batches"""
+    purged = 0
+    while True:
+        now = datetime.datetime.utcnow()
+        expired = select(RevokedToken.token_digest).where(RevokedToken.expires_at < now).limit(batch_size)
+        deleted = db.session.execute(
+            delete(RevokedToken).where(RevokedToken.token_digest.in_(expired)),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        db.session.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+def _sync_revocations(app):
+    while True:
+        try:
+            with app.app_context():
+                load_revocations()
+        except Exception:
+            logger.exception('Refreshing the token revocation list failed')
+        time.sleep(app.config.get('REVOCATION_REFRESH', REVOCATION_REFRESH))
+
+def _start_revocation_sync():
+    """Keep the revocation list fresh from a background thread, so requests never query it"""
+    global _revocation_sync
+    if _revocation_sync is not None:
+        return
+    with _revocation_sync_lock:
+        if _revocation_sync is None:
+            _revocation_sync = threading.Thread(
+                target=_sync_revocations, args=(current_app._get_current_object(),),
+                name='token-revocations', daemon=True
+            )
+            _revocation_sync.start()
+
+def user_is_admin(user_id):
+    """Whether a user has the admin role, from a short-lived cache"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return False
+
+    now = time.monotonic()
+    with _admin_roles_lock:
+        cached = _admin_roles.get(user_id)
+        if cached is not None and cached[1] > now:
+            _admin_roles.move_to_end(user_id)
+            return cached[0]
+
+    user = db.session.get(User, user_id)
+    role = bool(user and getattr(user, 'is_admin', False))
+    with _admin_roles_lock:
+        _admin_roles[user_id] = (role, now + ADMIN_ROLE_TTL)
+        if len(_admin_roles) > ADMIN_ROLE_CACHE_SIZE:
+            _admin_roles.popitem(last=False)
+    return role
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_admin_role(mapper, connection, target):
+    # Promotions, demotions and deletions made through this process apply at once
+    with _admin_roles_lock:
+        _admin_roles.pop(target.id, None)
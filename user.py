@@ -1,14 +1,30 @@
+import click
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.models.user_schema import user_email_normalized_index  # noqa: F401 (adds User.email_normalized)
+from src.services.idempotency import idempotent
+from src.services.guest_cart import merge_guest_cart
+from src.services.tokens import issue_token, bearer_token, revoke_token, purge_revoked_tokens
+from src.services.passwords import init_password_hasher, authenticate, PasswordHasherBusy
+from src.services.rate_limit import init_rate_limiter, rate_limit, by_login_email
+from src.services.user_listing import list_users
+from src.services.user_import import read_records, import_users
+from src.services.user_email import find_user_by_email, migrate_email_column
 
 user_bp = Blueprint('user', __name__)
 
+@user_bp.record_once
+def _setup_services(state):
+    init_password_hasher(state.app)
+    init_rate_limiter(state.app)
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    return list_users()
 
 @user_bp.route('/users', methods=['POST'])
+@rate_limit('signup', limit=10, per=60)
+@idempotent
 def create_user():
     
     data = request.json
@@ -17,6 +33,34 @@ def create_user():
     db.session.commit()
     return jsonify(user.to_dict()), 201
 
+@user_bp.route('/users/login', methods=['POST'])
+@rate_limit('login-ip', limit=20, per=60)
+@rate_limit('login-account', limit=5, per=60, key=by_login_email)
+def login():
+    data = request.json
+    user = find_user_by_email(data.get('email'))
+    try:
+        valid = authenticate(user, data.get('password'))
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Too many sign-ins in progress, please retry'}), 503, {'Retry-After': '1'}
+    if not valid:
+        return jsonify({'error': 'Invalid email or password'}), 401
+
+    # Move the guest cart held in the cookie into the user's cart; the commit
+    # also stores an upgraded password hash
+    response = jsonify({'token': issue_token(user.id), 'user': user.to_dict()})
+    merge_guest_cart(user.id, response)
+    db.session.commit()
+    return response
+
+@user_bp.route('/users/logout', methods=['POST'])
+def logout():
+    token = bearer_token()
+    if not token or not revoke_token(token):
+        return jsonify({'error': 'Missing or invalid token'}), 401
+    db.session.commit()
+    return '', 204
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -37,3 +81,40 @@ def delete_user(user_id):
     db.session.delete(user)
     db.session.commit()
     return '', 204
+
+@user_bp.cli.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='defaults to the file extension')
+@click.option('--chunk-size', default=1000, show_default=True, help='rows validated and inserted per transaction')
+def import_users_command(path, fmt, chunk_size):
+    """Bulk-create users from a CSV or NDJSON file"""
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(path, 'rb') as stream:
+        report = import_users(
+            read_records(stream, fmt),
+            chunk_size=chunk_size,
+            progress=lambda r: click.echo(f"imported {r['imported']}, failed {r['failed']}")
+        )
+    for error in report['errors']:
+        click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(f"Imported {report['imported']} users, {report['failed']} rows failed")
+
+@user_bp.cli.command('migrate-emails')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows updated per transaction')
+def migrate_emails_command(chunk_size):
+    """Add, backfill and index the normalized email column"""
+    def report(migrated, last_id, max_id):
+        click.echo(f'{migrated} users migrated (ids up to {min(last_id, max_id)} of {max_id})')
+
+    try:
+        migrated = migrate_email_column(db.session, User.__table__, chunk_size=chunk_size, progress=report)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Done: {migrated} users migrated')
+
+@user_bp.cli.command('purge-revoked-tokens')
+@click.option('--batch-size', default=1000, show_default=True, help='Revocations deleted per transaction')
+def purge_revoked_tokens_command(batch_size):
+    """Delete revocations of expired tokens; run it from a scheduler"""
+    purged = purge_revoked_tokens(batch_size=batch_size)
+    click.echo(f'Purged {purged} expired token revocations')
@@ -0,0 +1,61 @@
+from sqlalchemy import bindparam, event, func, inspect, select, text, update
+from src.models.user import User
+
+def normalize_email(email):
+    """The form emails are compared in: surrounding whitespace dropped, lower-cased"""
+    return (email or '').strip().lower()
+
+def sync_email_column(model):
+    """Derive email_normalized from email whenever a user is flushed"""
+    def sync(mapper, connection, target):
+        target.email_normalized = normalize_email(target.email) if target.email is not None else None
+
+    event.listen(model, 'before_insert', sync)
+    event.listen(model, 'before_update', sync)
+
+def find_user_by_email(email, **filters):
+    """Look a user up by email with a single probe of the normalized-email index"""
+    return User.query.filter(User.email_normalized == normalize_email(email)).filter_by(**filters).first()
+
+def migrate_email_column(session, table, chunk_size=1000, progress=None):
+    """Add email_normalized to an existing users table, backfill it in id chunks, then index it.
+
+    The values are computed in Python with normalize_email rather than SQL
+    lower(), which only folds ASCII on SQLite. Raises ValueError, before any
+    index is created, if two accounts collide once normalized. Returns the
+    number of rows migrated.
+    """
+    bind = session.get_bind()
+    existing = {column['name'] for column in inspect(bind).get_columns(table.name)}
+    if 'email_normalized' not in existing:
+        session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN email_normalized VARCHAR(120)'))
+    session.commit()
+
+    stmt = update(table).where(table.c.id == bindparam('user_id')).values(email_normalized=bindparam('normalized'))
+    migrated = 0
+    last_id = 0
+    max_id = session.scalar(select(func.max(table.c.id))) or 0
+    while last_id < max_id:
+        upper = last_id + chunk_size
+        rows = session.execute(
+            select(table.c.id, table.c.email).where(
+                table.c.id > last_id, table.c.id <= upper, table.c.email_normalized.is_(None)
+            )
+        ).all()
+        if rows:
+            session.execute(stmt, [{'user_id': user_id, 'normalized': normalize_email(email)} for user_id, email in rows])
+        session.commit()
+        migrated += len(rows)
+        last_id = upper
+        if progress:
+            progress(migrated, last_id, max_id)
+
+    duplicates = session.scalars(
+        select(table.c.email_normalized).group_by(table.c.email_normalized).having(func.count() > 1).limit(20)
+    ).all()
+    if duplicates:
+        raise ValueError(f"Emails shared by several accounts once normalized: {', '.join(duplicates)}")
+
+    for index in table.indexes:
+        index.create(bind, checkfirst=True)
+    return migrated
@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+from flask import Response, jsonify, request, stream_with_context
+from src.models.user import User, db
+from src.models.user_schema import user_email_normalized_index  # noqa: F401 (adds User.email_normalized)
+from src.services.user_email import normalize_email
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Rows read per short transaction while streaming NDJSON
+STREAM_PAGE_SIZE = 1000
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value)
+
+def _parse_bool(value):
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(value)
+
+def user_filters(args):
+    """Build WHERE clauses from email_prefix, created_after, created_before and is_admin.
+
+    Raises ValueError on a malformed value.
+    """
+    clauses = []
+    email_prefix = args.get('email_prefix')
+    if email_prefix:
+        clauses.append(User.email_normalized.startswith(normalize_email(email_prefix), autoescape=True))
+    created_after = args.get('created_after', type=_parse_datetime)
+    if 'created_after' in args and created_after is None:
+        raise ValueError('created_after must be an ISO date')
+    if created_after is not None:
+        clauses.append(User.created_at >= created_after)
+    created_before = args.get('created_before', type=_parse_datetime)
+    if 'created_before' in args and created_before is None:
+        raise ValueError('created_before must be an ISO date')
+    if created_before is not None:
+        clauses.append(User.created_at < created_before)
+    is_admin = args.get('is_admin', type=_parse_bool)
+    if 'is_admin' in args and is_admin is None:
+        raise ValueError('is_admin must be true or false')
+    if is_admin is not None:
+        clauses.append(User.is_admin == is_admin)
+    return clauses
+
+def _ndjson(query):
+    # Keyset pages, each serialized and its transaction ended before it is
+    # sent, so a slow client never holds SQLite's read lock against writers.
+    # Like the admin exports, the stream is not one snapshot.
+    last_id = None
+    while True:
+        page = (query if last_id is None else query.filter(User.id > last_id)).limit(STREAM_PAGE_SIZE).all()
+        lines = ''.join(json.dumps(user.to_dict(), default=str) + '\n' for user in page)
+        last_id = page[-1].id if page else last_id
+        db.session.rollback()
+        if lines:
+            yield lines
+        if len(page) < STREAM_PAGE_SIZE:
+            return
+
+def list_users():
+    """Respond with one keyset page of users, or every user as NDJSON.
+
+    Pages are ordered by id; ``after`` is the last id of the previous page and
+    the next page is advertised in a ``Link: <...>; rel="next"`` header, so
+    the body stays a plain array. ``format=ndjson`` streams all matching rows, a page at a time.
+    """
+    try:
+        clauses = user_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = User.query.filter(*clauses).order_by(User.id)
+
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(_ndjson(query)), mimetype='application/x-ndjson')
+
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    after = request.args.get('after', type=int)
+    if after is not None:
+        query = query.filter(User.id > after)
+    users = query.limit(limit).all()
+
+    response = jsonify([user.to_dict() for user in users])
+    if len(users) == limit:
+        args = request.args.to_dict()
+        args.update(after=users[-1].id, limit=limit)
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
@@ -0,0 +1,17 @@
+from src.models.user import db, User
+from src.services.user_email import sync_email_column
+
+# Lower-cased, trimmed copy of email that every lookup goes through, so
+# 'Ada@Mauma.ng ' and 'ada@mauma.ng' are the same account and a login is one
+# index probe. Existing databases get it from `flask user migrate-emails`.
+User.email_normalized = db.Column(db.String(120))
+
+user_email_normalized_index = db.Index('uq_users_email_normalized', User.email_normalized, unique=True)
+
+# Admin logins filter on is_admin too; this index holds only the admin rows
+admin_email_index = db.Index(
+    'ix_users_admin_email_normalized', User.email_normalized,
+    sqlite_where=User.is_admin == True, postgresql_where=User.is_admin == True
+)
+
+sync_email_column(User)